@@ -1,13 +1,16 @@
 import os
+import math
 import time
 import json
 import base64
+import hashlib
 import logging
+import functools
 import subprocess
 from datetime import datetime
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, send_from_directory
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, send_from_directory, make_response, Response
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -28,6 +31,14 @@ os.makedirs('temp', exist_ok=True)
 from utils.openai_helper import analyze_product, generate_persona_descriptions
 from utils.similar_products import get_similar_products, check_duplicate_product
 from utils.video_generator import generate_video_openai, get_video_for_product
+from utils.product_store import product_store
+from utils import json_codec
+from utils import catalog_paths
+from utils import pagination
+from utils.versioned_cache import VersionedLRUCache
+from utils.search_index import FIELD_WEIGHTS
+from utils.facets import facet_matcher
+from utils.search_text import normalize_text
 
 # File upload configuration
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp'}
@@ -37,6 +48,56 @@ MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def _build_fingerprint():
+    """
+    Hash of everything besides the catalog that pages are rendered from, so a
+    deploy or a configuration change changes every ETag: the names, sizes and
+    mtimes of the templates and of the application's Python files, the facet
+    taxonomy and the search field weights.
+    """
+    digest = hashlib.md5()
+    folders = [(os.path.join(app.root_path, app.template_folder), None),
+               (app.root_path, '.py'),
+               (os.path.join(app.root_path, 'utils'), '.py')]
+    for folder, suffix in folders:
+        for name in sorted(os.listdir(folder)):
+            if suffix and not name.endswith(suffix):
+                continue
+            path = os.path.join(folder, name)
+            stat = os.stat(path)
+            digest.update(f"{os.path.relpath(path, app.root_path)}:{stat.st_size}:{stat.st_mtime_ns};".encode('utf-8'))
+    digest.update(f"{facet_matcher.fingerprint};{sorted(SEARCH_FIELD_WEIGHTS.items())}".encode('utf-8'))
+    return digest.hexdigest()
+
+def catalog_etag(view):
+    """
+    Serve a page rendered only from the catalog with an ETag, and answer a
+    matching If-None-Match with 304 before the view loads or renders anything.
+
+    The ETag covers the catalog version (increased by every product write), the
+    URL with its query string and BUILD_FINGERPRINT, so it changes whenever the
+    page could. Requests with pending flash messages are always rendered, because
+    the page is what shows them.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if session.get('_flashes') or session.get('persona_success'):
+            return view(*args, **kwargs)
+        etag = hashlib.md5(f"{BUILD_FINGERPRINT}:{product_store.version()}:{request.full_path}"
+                           .encode('utf-8')).hexdigest()
+        if request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag)
+        # Let browsers and proxies keep the page, but revalidate it on every use
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
+
+
 @app.route('/')
 def index():
     """Render the main page of the application."""
@@ -96,7 +157,8 @@ def upload_product():
                 
                 # Save file
                 filename = secure_filename(file.filename)
-                file_path = os.path.join('raw', f"{timestamp}_{filename}")
+                file_path = catalog_paths.raw_file_path(f"{timestamp}_{filename}")
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
                 file.save(file_path)
                 saved_images.append(file_path)
                 
@@ -144,11 +206,8 @@ def upload_product():
                                 
                                 # Try to find an image as fallback
                                 try:
-                                    product_path = f"response/{dup.get('product_id')}.json"
-                                    if os.path.exists(product_path):
-                                        with open(product_path, 'r') as f:
-                                            product_data = json.load(f)
-                                            
+                                    product_data = product_store.get(dup.get('product_id'))
+                                    if product_data:
                                         # Try to get an image path
                                         from utils.similar_products import get_product_image_path
                                         img_path = get_product_image_path(product_data, debug=True)
@@ -282,7 +341,8 @@ def upload_product():
         # Add image URLs to the result
         image_urls = []
         for image_path in saved_images:
-            filename = image_path.replace('raw/', '')
+            # Image URLs stay /raw/<filename>; the route resolves the shard
+            filename = os.path.basename(image_path)
             image_url = url_for('serve_raw_file', filename=filename)
             image_urls.append(image_url)
             
@@ -298,10 +358,8 @@ def upload_product():
         result['images'] = saved_images
         result['raw_images'] = saved_images  # Store in both formats for compatibility
         
-        # Save response to JSON file
-        response_file = f"response/{timestamp}.json"
-        with open(response_file, 'w') as f:
-            json.dump(result, f, indent=2)
+        # Save response to the product store (writes response/<timestamp>.json)
+        product_store.put(result)
         
         # Store result in session
         session['product_result'] = {
@@ -359,11 +417,8 @@ def result():
                     else:
                         # Try to find an alternate image
                         try:
-                            product_path = f"response/{similar.get('product_id')}.json"
-                            if os.path.exists(product_path):
-                                with open(product_path, 'r') as f:
-                                    product_data = json.load(f)
-                                
+                            product_data = product_store.get(similar.get('product_id'))
+                            if product_data:
                                 from utils.similar_products import get_product_image_path
                                 img_path = get_product_image_path(product_data, debug=False)
                                 if img_path and os.path.exists(img_path):
@@ -390,45 +445,47 @@ def result():
 def download(timestamp):
     """Return the JSON response as a downloadable file."""
     try:
-        if not os.path.exists("response") or not os.path.isfile(f"response/{timestamp}.json"):
-            logging.error(f"File not found: response/{timestamp}.json")
+        product = product_store.get(timestamp)
+        if product is None:
+            logging.error(f"Product not found for download: {timestamp}")
             return jsonify({'error': 'File not found'}), 404
         
-        # Use send_from_directory to force file download with attachment header
-        return send_from_directory(
-            directory="response",
-            path=f"{timestamp}.json",
-            as_attachment=True,
-            download_name=f"product_{timestamp}.json"
-        )
+        # Serialize from the product store so downloads work with every backend,
+        # pretty-printed for people, and force a file download with an attachment header
+        response = app.response_class(json_codec.dumps_bytes(product, pretty=True), mimetype='application/json')
+        response.headers['Content-Disposition'] = f'attachment; filename=product_{timestamp}.json'
+        return response
     except Exception as e:
         logging.error(f"Error downloading result: {str(e)}")
         return jsonify({'error': str(e)}), 500
         
 @app.route('/raw/<path:filename>')
 def serve_raw_file(filename):
-    """Serve files from the raw directory."""
+    """Serve files from the raw directory, resolving /raw/<filename> to the file's shard."""
     logging.info(f"Serving raw file: {filename}")
     
-    # Log the full file path for debugging
-    full_path = os.path.join('raw', filename)
-    logging.info(f"Full file path: {full_path}")
-    logging.info(f"File exists: {os.path.exists(full_path)}")
-    
-    # Add debug info to check all files in raw directory
-    all_raw_files = os.listdir('raw')
-    logging.info(f"Raw directory files (sample): {all_raw_files[:5]}")
+    # Look in the file's shard, then in the flat legacy layout
+    full_path = catalog_paths.resolve_raw_file(filename)
+    logging.info(f"Resolved file path: {full_path}")
     
-    # Check if file exists, if not try to find a match with a different case
-    if not os.path.exists(full_path):
-        possible_match = next((f for f in all_raw_files if f.lower() == filename.lower()), None)
-        if possible_match:
-            logging.info(f"Found case-insensitive match: {possible_match}")
-            filename = possible_match
+    # If not found, try to find a match with a different case in the same directories
+    if full_path is None:
+        basename = os.path.basename(filename)
+        for directory in (os.path.dirname(catalog_paths.raw_file_path(basename)), 'raw'):
+            try:
+                possible_match = next((f for f in os.listdir(directory) if f.lower() == basename.lower()), None)
+            except FileNotFoundError:
+                continue
+            if possible_match:
+                logging.info(f"Found case-insensitive match: {possible_match}")
+                full_path = os.path.join(directory, possible_match)
+                break
     
     try:
+        if full_path is None:
+            raise FileNotFoundError(filename)
         # Set CORS headers to allow the image to be loaded from any origin
-        response = send_from_directory('raw', filename)
+        response = send_from_directory(os.path.abspath('raw'), os.path.relpath(full_path, 'raw'))
         response.headers['Access-Control-Allow-Origin'] = '*'
         response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
         response.headers['Pragma'] = 'no-cache'
@@ -444,17 +501,14 @@ def serve_raw_file(filename):
 def generate_video(product_id):
     """Generate a product video from images."""
     try:
-        # Load product data from JSON file
-        response_file = f"response/{product_id}.json"
-        if not os.path.exists(response_file):
+        # Load product data from the product store
+        product_data = product_store.get(product_id)
+        if product_data is None:
             return jsonify({"success": False, "error": "Product not found"}), 404
-
-        with open(response_file, 'r') as f:
-            product_data = json.load(f)
             
         # Check for existing video
         video_filename = f"{product_id}_video.mp4"
-        video_path = os.path.join('raw', video_filename)
+        video_path = catalog_paths.raw_file_path(video_filename)
         
         # If there's an existing video, remove it so we can regenerate
         if os.path.exists(video_path):
@@ -523,12 +577,192 @@ def generate_video(product_id):
 
 @app.route('/response/<path:filename>')
 def serve_response_file(filename):
-    """Serve files from the response directory."""
+    """Serve files from the response directory; <product_id>.json is resolved to the product's export file."""
+    if filename.endswith('.json'):
+        path = catalog_paths.find_product_file(os.path.basename(filename)[:-len('.json')])
+        if path:
+            return send_from_directory(os.path.abspath('response'), os.path.relpath(path, 'response'))
     return send_from_directory('response', filename)
 
+# Catalog filter arguments, each answered by the facet of the same name
+CATALOG_FILTERS = ('category', 'color', 'material', 'style', 'audience')
+
+PRICE_ARGS = ('min_price', 'max_price')
+
+def _price_arg(name):
+    """
+    A price bound argument as a number, None if missing or empty.
+
+    Raises:
+        ValueError: If the argument is not a non-negative number
+    """
+    text = request.args.get(name, '').strip()
+    if not text:
+        return None
+    try:
+        value = float(text)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got {text!r}")
+    if not math.isfinite(value) or value < 0:
+        raise ValueError(f"{name} must be a non-negative number, got {text!r}")
+    return value
+
+def _price_bounds():
+    """
+    (min_price, max_price) from the request; None where not given.
+
+    Raises:
+        ValueError: If a bound is not a non-negative number
+    """
+    return tuple(_price_arg(name) for name in PRICE_ARGS)
+
+def _invalid_price_args():
+    """Names of the price bound arguments _price_bounds() rejects."""
+    invalid = []
+    for name in PRICE_ARGS:
+        try:
+            _price_arg(name)
+        except ValueError:
+            invalid.append(name)
+    return invalid
+
+def _catalog_selections(facets):
+    """
+    Products selected by the catalog's search query and by each active filter.
+
+    Args:
+        facets (FacetIndex): The store's facet index
+
+    Returns:
+        dict: Bitset of the selected products per active argument ('q' or a facet name)
+    """
+    selections = {}
+    query = request.args.get('q', '')
+    if query:
+        # Matched against each product's normalized search text, stored when it was written
+        selections['q'] = facets.from_ids(product_store.match_text(query))
+    for facet in CATALOG_FILTERS:
+        value = request.args.get(facet)
+        if value:
+            selections[facet] = facets.match(facet, value)
+    min_price, max_price = _price_bounds()
+    if min_price is not None or max_price is not None:
+        # Two binary searches over the (price, product ID) order
+        selections['price'] = facets.from_ids(product_store.price_range(min_price, max_price))
+    return selections
+
+def _combine_selections(facets, selections, skip=None):
+    """AND of every selection except skip's, as a bitset of products."""
+    selected = facets.all
+    for name, bits in selections.items():
+        if name != skip:
+            selected &= bits
+    return selected
+
+# Products selected by each (query, filters) combination and its option counts
+catalog_selection_cache = VersionedLRUCache(maxsize=256)
+
+def _catalog_selection(facets, version):
+    """
+    Products selected by the catalog's search query and filters, and the number of
+    products each filter option would select, cached per catalog version and
+    facet index.
+
+    The bitsets are positions in this facets instance, so they are only reused
+    with the same instance: a write between reading the version and the facet
+    index can't pair them with another instance's ordinals.
+
+    Args:
+        facets (FacetIndex): The store's facet index
+        version (str): Catalog version read before facets
+
+    Returns:
+        dict: selected (bitset of products), filtered (whether any filter is
+            active) and counts ({facet: {value: count}}, each facet counted
+            under the other active filters)
+    """
+    key = ((request.args.get('q', ''),) + tuple(request.args.get(facet) or '' for facet in CATALOG_FILTERS)
+           + _price_bounds())
+    version = (version, facets.generation)
+    selection = catalog_selection_cache.get(key, version)
+    if selection is None:
+        selections = _catalog_selections(facets)
+        selection = {
+            'selected': _combine_selections(facets, selections),
+            'filtered': bool(selections),
+            'counts': {facet: facets.counts(facet, _combine_selections(facets, selections, skip=facet))
+                       for facet in CATALOG_FILTERS},
+        }
+        catalog_selection_cache.put(key, version, selection)
+    return selection
+
+def _catalog_sort():
+    """Sort order requested by the sort argument, 'newest' if missing or unknown."""
+    sort_by = request.args.get('sort', 'newest')
+    return sort_by if sort_by in pagination.SORT_KEYS else 'newest'
+
+def _selected_ids(facets, selection):
+    """IDs of the products in a _catalog_selection(), or None if no filter is active."""
+    return facets.to_ids(selection['selected']) if selection['filtered'] else None
+
+def _catalog_page(facets, selection):
+    """
+    The page of catalog products requested by the page/per_page or cursor arguments.
+
+    Pages are numbered from 1. When a cursor argument is present (an empty one
+    starts at the top) it replaces page: the listing continues right after the
+    product the cursor was issued for, which stays stable while products are added.
+
+    Args:
+        facets (FacetIndex): The store's facet index
+        selection (dict): Selected products from _catalog_selection()
+
+    Returns:
+        dict: products (ProductSummary list), total, page, per_page, pages and
+            next_cursor (None on the last page)
+
+    Raises:
+        ValueError: If the cursor is invalid for the requested sort order
+    """
+    sort_by = _catalog_sort()
+    per_page = pagination.clamp_per_page(request.args.get('per_page', type=int))
+    cursor = request.args.get('cursor')
+    
+    # The filters are ANDed as bitsets and the total is their popcount, so no
+    # product is looked at until the page itself is collected
+    total = selection['selected'].bit_count()
+    matching_ids = _selected_ids(facets, selection)
+    
+    if cursor is not None:
+        page = None
+        after = pagination.decode_cursor(cursor, sort_by) if cursor else None
+        offset = 0
+    else:
+        page = max(request.args.get('page', 1, type=int), 1)
+        after = None
+        offset = (page - 1) * per_page
+    
+    # One extra product tells whether there is a next page
+    products = product_store.page_summaries(sort=sort_by, ids=matching_ids, offset=offset,
+                                            limit=per_page + 1, after=after)
+    next_cursor = None
+    if len(products) > per_page:
+        products = products[:per_page]
+        next_cursor = pagination.encode_cursor(products[-1], sort_by)
+    
+    return {
+        'products': products,
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'pages': max((total + per_page - 1) // per_page, 1),
+        'next_cursor': next_cursor,
+    }
+
 @app.route('/catalog')
+@catalog_etag
 def catalog():
-    """Display the catalog of all products."""
+    """Display one page of the catalog of all products."""
     # Get search/filter parameters
     query = request.args.get('q', '')
     category_filter = request.args.get('category')
@@ -536,141 +770,44 @@ def catalog():
     material_filter = request.args.get('material')
     style_filter = request.args.get('style')
     audience_filter = request.args.get('audience')
-    sort_by = request.args.get('sort', 'newest')
     
-    # Load all products from response files
-    products = []
-    try:
-        # Get all JSON files in the response directory
-        response_files = os.listdir('response')
-        response_files = [f for f in response_files if f.endswith('.json')]
-        
-        for filename in response_files:
-            file_path = os.path.join('response', filename)
-            try:
-                with open(file_path, 'r') as f:
-                    product_data = json.load(f)
-                    if 'product_id' not in product_data:
-                        # Add product_id if not present (for backward compatibility)
-                        product_id = filename.replace('.json', '')
-                        product_data['product_id'] = product_id
-                    products.append(product_data)
-            except Exception as e:
-                logging.error(f"Error loading {file_path}: {str(e)}")
-                continue
-    except Exception as e:
-        logging.error(f"Error listing response directory: {str(e)}")
+    # Filter options and the products matching each filter come from the
+    # store's facet index, which maps facet values to product IDs
+    # The version is read first, so a write in between makes the selection
+    # cached for these facets look older than it is and be replaced sooner
+    version = product_store.version()
+    facets = product_store.facet_index()
     
-    # Extract filter options from all products
-    all_categories = set()
-    all_colors = set()
-    all_materials = set()
-    all_styles = set()
-    all_audiences = set()
-    
-    for product in products:
-        # Categories
-        if 'category' in product:
-            all_categories.add(product['category'])
-        
-        # Extract keywords from tags, specifications, and descriptions
-        all_tags = (product.get('tags', []) + 
-                   product.get('specifications', []) + 
-                   product.get('seo_keywords', []))
-        
-        # Colors
-        color_keywords = ['red', 'blue', 'green', 'yellow', 'black', 'white', 
-                         'orange', 'purple', 'pink', 'brown', 'gray', 'grey', 
-                         'silver', 'gold', 'beige', 'navy', 'teal']
-        for tag in all_tags:
-            for color in color_keywords:
-                if color.lower() in tag.lower():
-                    all_colors.add(color.title())
-        
-        # Materials
-        material_keywords = ['cotton', 'polyester', 'wool', 'leather', 'silk', 
-                           'nylon', 'linen', 'plastic', 'metal', 'wood', 
-                           'glass', 'ceramic', 'rubber', 'carbon fiber', 'canvas']
-        for tag in all_tags:
-            for material in material_keywords:
-                if material.lower() in tag.lower():
-                    all_materials.add(material.title())
-        
-        # Styles
-        style_keywords = ['casual', 'formal', 'sporty', 'vintage', 'modern', 
-                         'classic', 'elegant', 'bohemian', 'minimalist', 
-                         'retro', 'contemporary', 'urban', 'luxury']
-        for tag in all_tags:
-            for style in style_keywords:
-                if style.lower() in tag.lower():
-                    all_styles.add(style.title())
-        
-        # Target Audiences
-        if 'target_audience' in product:
-            for audience in product.get('target_audience', []):
-                all_audiences.add(audience)
+    invalid = _invalid_price_args()
+    if invalid:
+        # A mistyped price filter; show the catalog without it
+        logging.warning(f"Ignoring catalog price filters: {', '.join(invalid)}")
+        args = request.args.to_dict()
+        for name in invalid:
+            args.pop(name)
+        return redirect(url_for('catalog', **args))
     
-    # Apply filters
-    filtered_products = []
-    for product in products:
-        # Skip products that don't match the search query
-        if query and query.lower() not in json.dumps(product).lower():
-            continue
-        
-        # Skip products that don't match the category filter
-        if category_filter and product.get('category') != category_filter:
-            continue
-        
-        # Skip products that don't match the color filter
-        if color_filter:
-            color_match = False
-            for tag in (product.get('tags', []) + product.get('specifications', []) + product.get('seo_keywords', [])):
-                if color_filter.lower() in tag.lower():
-                    color_match = True
-                    break
-            if not color_match:
-                continue
-        
-        # Skip products that don't match the material filter
-        if material_filter:
-            material_match = False
-            for tag in (product.get('tags', []) + product.get('specifications', []) + product.get('seo_keywords', [])):
-                if material_filter.lower() in tag.lower():
-                    material_match = True
-                    break
-            if not material_match:
-                continue
-        
-        # Skip products that don't match the style filter
-        if style_filter:
-            style_match = False
-            for tag in (product.get('tags', []) + product.get('specifications', []) + product.get('seo_keywords', [])):
-                if style_filter.lower() in tag.lower():
-                    style_match = True
-                    break
-            if not style_match:
-                continue
-        
-        # Skip products that don't match the audience filter
-        if audience_filter:
-            audience_match = False
-            for audience in product.get('target_audience', []):
-                if audience_filter.lower() in audience.lower():
-                    audience_match = True
-                    break
-            if not audience_match:
-                continue
-        
-        # Add product to filtered list
-        filtered_products.append(product)
+    selection = _catalog_selection(facets, version)
+    try:
+        listing = _catalog_page(facets, selection)
+    except ValueError as e:
+        # A stale or mangled cursor link; start again from the first page
+        logging.warning(f"Ignoring catalog cursor: {str(e)}")
+        args = request.args.to_dict()
+        args.pop('cursor', None)
+        return redirect(url_for('catalog', **args))
     
-    # Sort products
-    if sort_by == 'name_asc':
-        filtered_products.sort(key=lambda p: p.get('product_name', '').lower())
-    elif sort_by == 'name_desc':
-        filtered_products.sort(key=lambda p: p.get('product_name', '').lower(), reverse=True)
-    else:  # Default to newest
-        filtered_products.sort(key=lambda p: p.get('product_id', ''), reverse=True)
+    # Links to the neighbouring pages keep the search, filters and sort order
+    args = {key: value for key, value in request.args.items() if key not in ('page', 'cursor')}
+    prev_url = next_url = None
+    if listing['page'] is None:
+        if listing['next_cursor']:
+            next_url = url_for('catalog', cursor=listing['next_cursor'], **args)
+    else:
+        if listing['page'] > 1:
+            prev_url = url_for('catalog', page=min(listing['page'] - 1, listing['pages']), **args)
+        if listing['page'] < listing['pages']:
+            next_url = url_for('catalog', page=listing['page'] + 1, **args)
     
     # Prepare active filters display
     active_filters = {}
@@ -684,43 +821,160 @@ def catalog():
         active_filters['Style'] = style_filter
     if audience_filter:
         active_filters['Audience'] = audience_filter
+    min_price, max_price = _price_bounds()
+    if min_price is not None:
+        active_filters['Min price'] = request.args.get('min_price')
+    if max_price is not None:
+        active_filters['Max price'] = request.args.get('max_price')
     
     # Check if any filters are active
     any_filters_active = bool(query or active_filters)
     
     # Prepare filter options for display
     filters = {
-        'categories': sorted(list(all_categories)),
-        'colors': sorted(list(all_colors)),
-        'materials': sorted(list(all_materials)),
-        'styles': sorted(list(all_styles)),
-        'audiences': sorted(list(all_audiences))
+        'categories': facets.values('category'),
+        'colors': facets.values('color'),
+        'materials': facets.values('material'),
+        'styles': facets.values('style'),
+        'audiences': facets.values('audience')
+    }
+    
+    # Number of products each option would show, given the other active filters
+    filter_counts = {
+        'categories': selection['counts']['category'],
+        'colors': selection['counts']['color'],
+        'materials': selection['counts']['material'],
+        'styles': selection['counts']['style'],
+        'audiences': selection['counts']['audience']
     }
     
     return render_template('catalog.html', 
-                          products=filtered_products,
+                          products=listing['products'],
+                          total=listing['total'],
+                          page=listing['page'],
+                          pages=listing['pages'],
+                          prev_url=prev_url,
+                          next_url=next_url,
                           filters=filters,
+                          filter_counts=filter_counts,
                           active_filters=active_filters,
                           any_filters_active=any_filters_active,
                           request=request)
 
+@app.route('/api/catalog')
+@catalog_etag
+def catalog_api():
+    """
+    JSON version of the catalog page.
+
+    Accepts the same q, category, color, material, style, audience, min_price,
+    max_price, sort, page, per_page and cursor arguments as /catalog.
+    """
+    version = product_store.version()
+    facets = product_store.facet_index()
+    try:
+        selection = _catalog_selection(facets, version)
+        listing = _catalog_page(facets, selection)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    listing['products'] = [product.to_dict() for product in listing['products']]
+    listing['counts'] = selection['counts']
+    return jsonify(listing)
+
+# Fields /api/products can return from the listing index, without reading product records
+SUMMARY_FIELDS = ('product_id', 'product_name', 'category', 'price', 'short_description', 'image_urls', 'tags')
+
+# Products fetched from the store at a time while streaming an NDJSON export
+EXPORT_BATCH_SIZE = 500
+
+def _project(summary, fields):
+    """
+    Record of a product for /api/products.
+
+    Args:
+        summary (ProductSummary): The product's summary
+        fields (list or None): Fields to include; None for SUMMARY_FIELDS
+
+    Returns:
+        dict: The requested fields the product has. Fields outside
+            SUMMARY_FIELDS are read from the full product record.
+    """
+    record = summary.to_dict()
+    if fields is None:
+        return record
+    if any(field not in record for field in fields):
+        record = product_store.get(summary.product_id) or record
+    return {field: record[field] for field in fields if field in record}
+
+def _ndjson(records):
+    """One JSON document per line, encoded as the records are produced."""
+    for record in records:
+        yield json_codec.dumps_bytes(record) + b'\n'
+
+@app.route('/api/products')
+@catalog_etag
+def products_api():
+    """
+    Product records for downstream jobs.
+
+    Accepts the catalog's search, filter, sort and paging arguments, plus:
+    - fields: comma-separated fields to return (default: the listing fields);
+      any product field can be requested, e.g. fields=product_id,specifications
+    - format=ndjson: one record per line instead of a JSON page. Without page,
+      per_page or cursor it streams every matching product, fetching them in
+      batches, so the whole catalog can be exported in flat memory.
+    """
+    fields = [field.strip() for field in request.args.get('fields', '').split(',') if field.strip()] or None
+    ndjson = request.args.get('format') == 'ndjson'
+    version = product_store.version()
+    facets = product_store.facet_index()
+    try:
+        selection = _catalog_selection(facets, version)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if ndjson and not any(key in request.args for key in ('page', 'per_page', 'cursor')):
+        sort_by = _catalog_sort()
+        matching_ids = _selected_ids(facets, selection)
+        
+        def export():
+            after = None
+            while True:
+                batch = product_store.page_summaries(sort=sort_by, ids=matching_ids,
+                                                     limit=EXPORT_BATCH_SIZE, after=after)
+                for summary in batch:
+                    yield _project(summary, fields)
+                if len(batch) < EXPORT_BATCH_SIZE:
+                    return
+                after = pagination.sort_position(batch[-1], sort_by)
+        
+        return Response(_ndjson(export()), mimetype='application/x-ndjson',
+                        headers={'X-Total-Count': str(selection['selected'].bit_count())})
+    
+    try:
+        listing = _catalog_page(facets, selection)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    records = [_project(summary, fields) for summary in listing['products']]
+    if ndjson:
+        headers = {'X-Total-Count': str(listing['total'])}
+        if listing['next_cursor']:
+            headers['X-Next-Cursor'] = listing['next_cursor']
+        return Response(_ndjson(records), mimetype='application/x-ndjson', headers=headers)
+    listing['products'] = records
+    return jsonify(listing)
+
 @app.route('/product/<product_id>')
+@catalog_etag
 def view_product(product_id):
     """View a specific product."""
     try:
-        # Load product data from JSON file
-        response_file = f"response/{product_id}.json"
-        if not os.path.exists(response_file):
+        # Load product data from the product store
+        product = product_store.get(product_id)
+        if product is None:
             flash('Product not found', 'error')
             return redirect(url_for('catalog'))
         
-        with open(response_file, 'r') as f:
-            product = json.load(f)
-        
-        # Add product_id if not present
-        if 'product_id' not in product:
-            product['product_id'] = product_id
-        
         # Debug: Log the product data keys
         logging.info(f"Product data keys for {product_id}: {list(product.keys())}")
         
@@ -740,12 +994,9 @@ def view_product(product_id):
             # If raw_images exists but not image_paths, use those instead
             product['image_urls'] = []
             for img_path in product.get('raw_images', []):
-                # Make sure we have the right format - should be raw/filename.ext
-                if img_path.startswith('raw/'):
-                    url = f"/{img_path}"  # Add leading slash
-                else:
-                    filename = os.path.basename(img_path)
-                    url = f"/raw/{filename}"
+                # URLs use the bare file name (/raw/filename.ext) whatever the shard
+                filename = os.path.basename(img_path)
+                url = f"/raw/{filename}"
                 logging.info(f"Converting raw image to URL: {img_path} -> {url}")
                 product['image_urls'].append(url)
             logging.info(f"Created image_urls from raw_images: {product['image_urls']}")
@@ -833,11 +1084,8 @@ def view_product(product_id):
                             
                             try:
                                 # Load the product data to find images
-                                product_path = f"response/{similar.get('product_id')}.json"
-                                if os.path.exists(product_path):
-                                    with open(product_path, 'r') as f:
-                                        product_data = json.load(f)
-                                        
+                                product_data = product_store.get(similar.get('product_id'))
+                                if product_data:
                                     # Try to get an image path
                                     from utils.similar_products import get_product_image_path
                                     img_path = get_product_image_path(product_data, debug=False)
@@ -880,47 +1128,41 @@ def view_product(product_id):
 
 @app.route('/update_product/<product_id>', methods=['POST'])
 def update_product(product_id):
-    """Update a product's information and save changes back to JSON file."""
+    """Update a product's information and save changes back through the product store."""
     try:
-        # Load product data from JSON file
-        response_file = f"response/{product_id}.json"
-        if not os.path.exists(response_file):
+        def apply_form(product_data):
+            """Update fields from the form."""
+            product_data['product_name'] = request.form.get('product_name', product_data.get('product_name', ''))
+            product_data['category'] = request.form.get('category', product_data.get('category', ''))
+            product_data['price'] = request.form.get('price', product_data.get('price', ''))
+            product_data['short_description'] = request.form.get('short_description', product_data.get('short_description', ''))
+            
+            # Handle tags - these come as a list from the form
+            tags = request.form.getlist('tags')
+            if tags:
+                product_data['tags'] = tags
+            
+            # Handle target audience - these come as a list from the form
+            target_audience = request.form.getlist('target_audience')
+            if target_audience:
+                product_data['target_audience'] = target_audience
+            
+            # Update persona descriptions if provided
+            if 'persona_descriptions' in request.form:
+                # This would be a JSON string in the form
+                try:
+                    persona_descriptions = json.loads(request.form.get('persona_descriptions', '{}'))
+                    if persona_descriptions:
+                        product_data['persona_descriptions'] = persona_descriptions
+                except json.JSONDecodeError:
+                    pass
+        
+        # Apply the form to the latest saved version of the product while holding
+        # its lock, so concurrent updates from other workers are not lost
+        if product_store.update(product_id, apply_form) is None:
             flash('Product not found', 'error')
             return redirect(url_for('catalog'))
         
-        with open(response_file, 'r') as f:
-            product_data = json.load(f)
-        
-        # Update fields from the form
-        product_data['product_name'] = request.form.get('product_name', product_data.get('product_name', ''))
-        product_data['category'] = request.form.get('category', product_data.get('category', ''))
-        product_data['price'] = request.form.get('price', product_data.get('price', ''))
-        product_data['short_description'] = request.form.get('short_description', product_data.get('short_description', ''))
-        
-        # Handle tags - these come as a list from the form
-        tags = request.form.getlist('tags')
-        if tags:
-            product_data['tags'] = tags
-        
-        # Handle target audience - these come as a list from the form
-        target_audience = request.form.getlist('target_audience')
-        if target_audience:
-            product_data['target_audience'] = target_audience
-        
-        # Update persona descriptions if provided
-        if 'persona_descriptions' in request.form:
-            # This would be a JSON string in the form
-            try:
-                persona_descriptions = json.loads(request.form.get('persona_descriptions', '{}'))
-                if persona_descriptions:
-                    product_data['persona_descriptions'] = persona_descriptions
-            except json.JSONDecodeError:
-                pass
-                
-        # Save the updated product data back to the file
-        with open(response_file, 'w') as f:
-            json.dump(product_data, f, indent=4)
-        
         flash('Product information updated successfully.', 'success')
         return redirect(url_for('view_product', product_id=product_id))
     
@@ -936,15 +1178,12 @@ def generate_product_personas(product_id):
         # Clear any stale flash messages 
         session.pop('_flashes', None)
         
-        # Load product data from JSON file
-        response_file = f"response/{product_id}.json"
-        if not os.path.exists(response_file):
+        # Load product data from the product store
+        product_data = product_store.get(product_id)
+        if product_data is None:
             flash('Product not found', 'error')
             return redirect(url_for('catalog'))
         
-        with open(response_file, 'r') as f:
-            product_data = json.load(f)
-        
         # Check if OpenAI API key is available
         if not os.environ.get("OPENAI_API_KEY"):
             flash('Cannot generate persona descriptions: OpenAI API key is missing', 'error')
@@ -981,12 +1220,9 @@ def generate_product_personas(product_id):
             flash(f'Error generating persona descriptions: {str(e)}', 'error')
             return redirect(url_for('view_product', product_id=product_id))
         
-        # Update product data with new persona descriptions
-        product_data['persona_descriptions'] = result['persona_descriptions']
-        
-        # Save the updated product data back to the file
-        with open(response_file, 'w') as f:
-            json.dump(product_data, f, indent=4)
+        # Save the new persona descriptions onto the latest version of the product;
+        # other fields may have changed while the descriptions were generated
+        product_store.update(product_id, lambda p: p.update(persona_descriptions=result['persona_descriptions']))
         
         # Add a success message to the session for display
         session['persona_success'] = True
@@ -997,7 +1233,60 @@ def generate_product_personas(product_id):
         flash(f'Error generating persona descriptions: {str(e)}', 'error')
         return redirect(url_for('view_product', product_id=product_id))
 
+def _search_field_weights():
+    """
+    Field weights for ranking search results: FIELD_WEIGHTS, with any overrides
+    from the SEARCH_FIELD_WEIGHTS environment variable, e.g. "product_name=4,tags=2".
+    """
+    weights = dict(FIELD_WEIGHTS)
+    for item in os.environ.get('SEARCH_FIELD_WEIGHTS', '').split(','):
+        if not item.strip():
+            continue
+        field, _, weight = item.partition('=')
+        try:
+            if field.strip() not in weights:
+                raise ValueError(f"unknown field {field.strip()!r}")
+            weights[field.strip()] = float(weight)
+        except ValueError as e:
+            logging.warning(f"Ignoring search field weight {item!r}: {str(e)}")
+    return weights
+
+
+SEARCH_FIELD_WEIGHTS = _search_field_weights()
+# Taken once the search field weights are known, which it covers
+BUILD_FINGERPRINT = _build_fingerprint()
+SEARCH_RESULTS_LIMIT = 100
+SPOTLIGHT_RESULTS_LIMIT = 5
+
+# Spotlight results per normalized query, dropped when the catalog changes
+# (every upload, edit or persona write increases its version) or after 10 minutes
+spotlight_cache = VersionedLRUCache(maxsize=1024, ttl=600)
+
+
+def _ranked_summaries(query, limit, prefix=False):
+    """
+    Best matches of a search query, as ranked by the search index.
+
+    Args:
+        query (str): Search text
+        limit (int): Maximum number of products to return
+        prefix (bool): Treat the last word as partly typed, matching the
+            terms it is the beginning of
+
+    Returns:
+        list: (ProductSummary, relevance score) tuples, most relevant first
+    """
+    # With fewer than a handful of exact matches, misspelled words also match
+    # close terms of the index, ranked lower
+    ranked = product_store.search_index().rank(query, limit=limit, weights=SEARCH_FIELD_WEIGHTS,
+                                               prefix=prefix, fuzzy=True)
+    summaries = {summary.product_id: summary
+                 for summary in product_store.page_summaries(ids={product_id for product_id, _ in ranked})}
+    return [(summaries[product_id], score) for product_id, score in ranked if product_id in summaries]
+
+
 @app.route('/search')
+@catalog_etag
 def search_page():
     """Dedicated search page for finding products."""
     query = request.args.get('q', '')
@@ -1006,58 +1295,19 @@ def search_page():
     # Only search if query is provided
     if query and len(query) >= 2:
         try:
-            # Get all JSON files in the response directory
-            response_files = os.listdir('response')
-            response_files = [f for f in response_files if f.endswith('.json')]
-            
-            for filename in response_files:
-                file_path = os.path.join('response', filename)
-                try:
-                    with open(file_path, 'r') as f:
-                        product_data = json.load(f)
-                        product_id = filename.replace('.json', '')
-                        
-                        # Extract product information
-                        name = product_data.get('product_name', '')
-                        category = product_data.get('category', '')
-                        price = product_data.get('price', '')
-                        tags = product_data.get('tags', [])
-                        description = product_data.get('short_description', '')
-                        
-                        # If no dedicated description field, use first part of AI-generated description
-                        if not description and 'description' in product_data.get('ai_response', {}):
-                            description = product_data['ai_response']['description'][:100] + '...'
-                        
-                        # Get first image if available
-                        image = ''
-                        if 'image_urls' in product_data and product_data['image_urls']:
-                            # Use the image URL as is - should be in format /raw/filename
-                            image = product_data['image_urls'][0]
-                        elif 'image_paths' in product_data and product_data['image_paths']:
-                            image_path = os.path.basename(product_data['image_paths'][0])
-                            image = url_for('serve_raw_file', filename=image_path)
-                        
-                        # Create searchable text from all product fields
-                        searchable_text = f"{name} {category} {price} {' '.join(tags)} {description}".lower()
-                        
-                        # Add to results if query is found in searchable text
-                        if query.lower() in searchable_text:
-                            results.append({
-                                'product_id': product_id,
-                                'product_name': name,
-                                'category': category,
-                                'price': price,
-                                'tags': tags,
-                                'image_urls': [image] if image else [],
-                                'short_description': description
-                            })
-                except Exception as e:
-                    logging.error(f"Error loading {file_path}: {str(e)}")
-                    continue
-            
-            # Sort results by name
-            results.sort(key=lambda x: x['product_name'])
-            
+            # Products containing every term of the query, most relevant first
+            for product, _ in _ranked_summaries(query, SEARCH_RESULTS_LIMIT):
+                results.append({
+                    'product_id': product.product_id,
+                    'product_name': product.product_name,
+                    'category': product.category,
+                    'price': product.price,
+                    'tags': list(product.tags),
+                    # First image, already in /raw/filename format
+                    'image_urls': product.image_urls,
+                    'short_description': product.short_description
+                })
+
         except Exception as e:
             logging.error(f"Error in search: {str(e)}")
     
@@ -1070,79 +1320,87 @@ def spotlight_search():
     if not query or len(query) < 2:
         return jsonify([])
     
-    # Load all products from response files
-    products = []
-    try:
-        # Get all JSON files in the response directory
-        response_files = os.listdir('response')
-        response_files = [f for f in response_files if f.endswith('.json')]
-        
-        for filename in response_files:
-            file_path = os.path.join('response', filename)
-            try:
-                with open(file_path, 'r') as f:
-                    product_data = json.load(f)
-                    if 'product_id' not in product_data:
-                        # Add product_id if not present (for backward compatibility)
-                        product_id = filename.replace('.json', '')
-                        product_data['product_id'] = product_id
-                    
-                    # Get first image URL if available
-                    image_url = ''
-                    if 'image_urls' in product_data and product_data['image_urls']:
-                        # Make sure the image URLs start with "/raw/"
-                        img_url = product_data['image_urls'][0]
-                        if not img_url.startswith('/raw/'):
-                            filename = os.path.basename(img_url)
-                            image_url = f"/raw/{filename}"
-                            logging.info(f"Spotlight search: fixed image URL {img_url} -> {image_url}")
-                        else:
-                            image_url = img_url
-                    
-                    # Simplified product object for search results
-                    simplified_product = {
-                        'product_id': product_data.get('product_id', ''),
-                        'product_name': product_data.get('product_name', ''),
-                        'category': product_data.get('category', ''),
-                        'price': product_data.get('price', ''),
-                        'short_description': product_data.get('short_description', '')[:100] + '...' if product_data.get('short_description') else '',
-                        'image_urls': [image_url] if image_url else [],
-                        'tags': product_data.get('tags', [])[:6]  # Limit tags to first 6
-                    }
-                    products.append(simplified_product)
-            except Exception as e:
-                logging.error(f"Error loading {file_path}: {str(e)}")
-                continue
-    except Exception as e:
-        logging.error(f"Error listing response directory: {str(e)}")
-        return jsonify([])
+    # Queries differing only in case, accents or punctuation share an entry
+    key = normalize_text(query)
+    version = product_store.version()
+    search_results = spotlight_cache.get(key, version)
+    if search_results is not None:
+        return jsonify(search_results)
     
-    # Filter products based on search query
+    # Called as the user types, so the last word may be incomplete
     search_results = []
-    for product in products:
-        product_json = json.dumps(product).lower()
-        if query in product_json:
-            # Calculate a simple relevance score (more matches = higher score)
-            relevance = product_json.count(query)
-            # Boost score if query matches beginning of name
-            if product['product_name'].lower().startswith(query):
-                relevance += 10
-            # Boost score if query matches category exactly
-            if product['category'].lower() == query:
-                relevance += 5
-            # Boost score if query matches tag exactly
-            for tag in product.get('tags', []):
-                if tag.lower() == query:
-                    relevance += 3
-            
-            product['relevance'] = relevance
-            search_results.append(product)
-    
-    # Sort by relevance
-    search_results.sort(key=lambda x: x['relevance'], reverse=True)
+    for product, score in _ranked_summaries(query, SPOTLIGHT_RESULTS_LIMIT, prefix=True):
+        # Make sure the image URL starts with "/raw/"
+        image_url = product.image_url
+        if image_url and not image_url.startswith('/raw/'):
+            image_url = f"/raw/{os.path.basename(image_url)}"
+        
+        # Simplified product object for search results
+        search_results.append({
+            'product_id': product.product_id,
+            'product_name': product.product_name,
+            'category': product.category,
+            'price': product.price,
+            'short_description': product.short_description[:100] + '...' if product.short_description else '',
+            'image_urls': [image_url] if image_url else [],
+            'tags': list(product.tags[:6]),  # Limit tags to first 6
+            'relevance': round(score, 4)
+        })
     
-    # Limit to top 5 results
-    return jsonify(search_results[:5])
+    spotlight_cache.put(key, version, search_results)
+    return jsonify(search_results)
+
+@app.route('/api/cache-stats')
+def cache_stats():
+    """Hit and miss counters of the spotlight and catalog caches, for sizing them."""
+    return jsonify({
+        'spotlight': spotlight_cache.stats(),
+        'catalog_selection': catalog_selection_cache.stats(),
+    })
+
+@app.cli.command('migrate-sqlite')
+def migrate_sqlite_command():
+    """Import every response/*.json product into the SQLite catalog."""
+    from utils.sqlite_catalog import migrate_from_directory
+    db_path = os.environ.get('CATALOG_DB_PATH', 'catalog.db')
+    imported = migrate_from_directory('response', db_path)
+    print(f"Imported {imported} products into {db_path}")
+
+@app.cli.command('migrate-shards')
+def migrate_shards_command():
+    """Move flat raw/ and response/ files into the sharded directory layout."""
+    raw_moved, products_moved = catalog_paths.migrate_to_sharded_layout('response', 'raw')
+    # Point the raw paths stored in the catalog at the moved files
+    updated = 0
+    for product in product_store.list():
+        changes = catalog_paths.sharded_raw_fields(product)
+        if changes:
+            product_store.update(product['product_id'], lambda p, changes=changes: p.update(changes))
+            updated += 1
+    print(f"Moved {raw_moved} raw files and {products_moved} product files into shards, updated {updated} products")
+
+@app.cli.command('rebuild-index')
+def rebuild_index_command():
+    """Regenerate response/_index from the per-product JSON files."""
+    if not hasattr(product_store, 'rebuild_index'):
+        print("The configured catalog backend has no listing index")
+        return
+    count = product_store.rebuild_index()
+    print(f"Rebuilt the listing index with {count} products")
+
+@app.cli.command('compact-catalog')
+def compact_catalog_command():
+    """Fold the catalog journal into a new snapshot."""
+    if not hasattr(product_store, 'compact'):
+        print("The configured catalog backend has no journal to compact")
+        return
+    product_store.compact()
+    print(f"Compacted the catalog journal ({len(product_store.list())} products)")
+
+@app.cli.command('backfill-search-text')
+def backfill_search_text_command():
+    """Recompute and store the search text of every product."""
+    print(f"Recomputed the search text of {product_store.rebuild_search_text()} products")
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5050, debug=True)
@@ -0,0 +1,66 @@
+"""
+Catalog load: parsing one export file per product and summarizing it (before)
+vs utils.product_store.ProductStore.load() (after), which reads the journal
+snapshot in one sequential read. The snapshot holds the records without their
+detail fields, which stay in side records until get() needs them, and the
+listing summaries come from the listing index instead of being rebuilt.
+
+    python -m benchmarks.bench_catalog_journal [count]
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+from benchmarks.synthetic_catalog import make_catalog
+from utils import catalog_paths
+from utils import json_codec
+from utils.product_store import ProductStore
+from utils.product_summary import ProductSummary
+
+
+def timed(label, load):
+    start = time.perf_counter()
+    count = load()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<34} {count:8,} products {elapsed * 1000:9.1f} ms")
+    return elapsed
+
+
+def main(count=20_000):
+    work = tempfile.mkdtemp()
+    try:
+        directory = os.path.join(work, 'response')
+        for product in make_catalog(count):
+            path = catalog_paths.product_file_path(product['product_id'], directory)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(json_codec.dumps_bytes(product))
+        # The first load imports the export files and writes the snapshot
+        ProductStore(directory).load()
+
+        def load_files():
+            # What ProductStore.load() did before the journal: keep each record and its summary
+            products = {}
+            summaries = {}
+            for product_id, path in catalog_paths.iter_product_files(directory):
+                products[product_id] = json_codec.read_file(path)
+                summaries[product_id] = ProductSummary.from_product(products[product_id])
+            return len(products)
+
+        def load_snapshot():
+            store = ProductStore(directory)
+            store.load()
+            return len(store.list())
+
+        print(f"products: {count:,}   codec backend: {json_codec.BACKEND}")
+        baseline = timed('before: parse every export file', load_files)
+        optimized = timed('after: snapshot + journal replay', load_snapshot)
+        print(f"speedup: {baseline / optimized:.1f}x")
+    finally:
+        shutil.rmtree(work)
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
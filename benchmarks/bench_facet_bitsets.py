@@ -0,0 +1,115 @@
+"""
+Catalog query with five active filters (category, color, material, style and
+audience), plus the product count of every option of those filters given the
+other four, as the catalog page shows them:
+
+- per-product scan: every filter re-walks each product's keywords
+- ID sets: intersect sets of product IDs per facet value
+- bitsets: utils.facet_index.FacetIndex, AND over int bitsets and popcount
+
+    python -m benchmarks.bench_facet_bitsets [count]
+"""
+import sys
+import time
+
+from benchmarks.synthetic_catalog import make_catalog
+from utils.facet_index import FACET_ATTRIBUTES, FacetIndex
+from utils.product_summary import ProductSummary
+
+FILTERS = {'category': 'Hoodies', 'color': 'Black', 'material': 'Cotton', 'style': 'Sporty', 'audience': 'runners'}
+ROUNDS = 20
+
+
+def timed(label, query):
+    query()
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        total, counts = query()
+    elapsed = (time.perf_counter() - start) / ROUNDS
+    print(f"{label:<18} {total:6,} matches {sum(counts.values()):8,} option counts {elapsed * 1000:9.2f} ms/query")
+    return elapsed
+
+
+def scan_matches(summary, facet, value):
+    """The catalog's original per-product check of one filter."""
+    if facet == 'category':
+        return summary.category == value
+    if facet == 'audience':
+        return any(value.lower() in audience.lower() for audience in summary.audiences)
+    return any(value.lower() in keyword for keyword in summary.keywords)
+
+
+def main(count=100_000):
+    summaries = [ProductSummary.from_product(product) for product in make_catalog(count)]
+
+    def per_product_scan():
+        def selected(skip=None):
+            return [s for s in summaries
+                    if all(scan_matches(s, facet, value) for facet, value in FILTERS.items() if facet != skip)]
+        matches = selected()
+        counts = {}
+        for facet in FILTERS:
+            attribute = FACET_ATTRIBUTES[facet]
+            for summary in selected(skip=facet):
+                values = getattr(summary, attribute)
+                for value in (values,) if isinstance(values, str) else values:
+                    counts[(facet, value)] = counts.get((facet, value), 0) + 1
+        return len(matches), counts
+
+    postings = {facet: {} for facet in FACET_ATTRIBUTES}
+    for summary in summaries:
+        for facet, attribute in FACET_ATTRIBUTES.items():
+            values = getattr(summary, attribute)
+            for value in (values,) if isinstance(values, str) else values:
+                postings[facet].setdefault(value, set()).add(summary.product_id)
+
+    def id_sets():
+        selections = {'category': postings['category'][FILTERS['category']],
+                      'color': postings['color'][FILTERS['color']],
+                      'material': postings['material'][FILTERS['material']],
+                      'style': postings['style'][FILTERS['style']]}
+        audience = set()
+        for value, ids in postings['audience'].items():
+            if FILTERS['audience'] in value.lower():
+                audience |= ids
+        selections['audience'] = audience
+
+        def selected(skip=None):
+            ids = None
+            for facet, members in selections.items():
+                if facet != skip:
+                    ids = set(members) if ids is None else ids & members
+            return ids
+        matches = selected()
+        counts = {(facet, value): len(ids & selected(skip=facet))
+                  for facet in FILTERS for value, ids in postings[facet].items()}
+        return len(matches), counts
+
+    facets = FacetIndex(summaries)
+
+    def bitsets():
+        selections = {facet: facets.match(facet, value) for facet, value in FILTERS.items()}
+
+        def selected(skip=None):
+            bits = facets.all
+            for facet, members in selections.items():
+                if facet != skip:
+                    bits &= members
+            return bits
+        matches = selected()
+        counts = {}
+        for facet in FILTERS:
+            for value, number in facets.counts(facet, selected(skip=facet)).items():
+                counts[(facet, value)] = number
+        facets.to_ids(matches)
+        return matches.bit_count(), counts
+
+    print(f"products: {count:,}   active filters: {', '.join(f'{k}={v}' for k, v in FILTERS.items())}")
+    scan = timed('per-product scan', per_product_scan)
+    sets = timed('ID sets', id_sets)
+    bits = timed('bitsets', bitsets)
+    print(f"speedup: {scan / bits:.1f}x over the scan, {sets / bits:.1f}x over ID sets")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
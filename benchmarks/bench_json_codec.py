@@ -0,0 +1,40 @@
+"""
+Product file parse throughput and size: indented stdlib json (before) vs the
+compact utils.json_codec format (after).
+
+    python -m benchmarks.bench_json_codec [count]
+"""
+import sys
+import json
+import time
+
+from benchmarks.synthetic_catalog import make_catalog
+from utils import json_codec
+
+
+def throughput(label, documents, parse):
+    start = time.perf_counter()
+    for document in documents:
+        parse(document)
+    elapsed = time.perf_counter() - start
+    size = sum(len(document) for document in documents)
+    print(f"{label:<34} {len(documents) / elapsed:10,.0f} files/s {size / elapsed / 2**20:8.1f} MiB/s "
+          f"avg {size / len(documents):7,.0f} B/file")
+    return elapsed
+
+
+def main(count=20_000):
+    products = make_catalog(count)
+    before = [json.dumps(product, indent=2).encode('utf-8') for product in products]
+    after = [json_codec.dumps_bytes(product) for product in products]
+
+    print(f"products: {count:,}   codec backend: {json_codec.BACKEND}")
+    baseline = throughput('before: json.load, indent=2', before, json.loads)
+    throughput('stdlib json, compact files', after, json.loads)
+    optimized = throughput(f"after: json_codec ({json_codec.BACKEND}), compact", after, json_codec.loads)
+    print(f"parse speedup: {baseline / optimized:.1f}x   "
+          f"size reduction: {sum(map(len, before)) / sum(map(len, after)):.2f}x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
@@ -0,0 +1,45 @@
+"""
+Memory used by the catalog listing data: full product dicts vs ProductSummary.
+
+    python -m benchmarks.bench_product_summary [count]
+"""
+import gc
+import sys
+import json
+import tracemalloc
+
+from benchmarks.synthetic_catalog import make_catalog_json
+from utils.product_summary import ProductSummary
+
+
+def measure(build):
+    """Return (result, bytes retained by result) for a builder function."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, retained
+
+
+def main(count=50_000):
+    documents = make_catalog_json(count)
+
+    # What the listing routes used to hold: one parsed dict per product file
+    dicts, dict_bytes = measure(lambda: [json.loads(document) for document in documents])
+    del dicts
+
+    # Summaries built file by file; each parsed dict is dropped straight away
+    summaries, summary_bytes = measure(
+        lambda: [ProductSummary.from_product(json.loads(document)) for document in documents])
+
+    print(f"products:           {count:,}")
+    print(f"list of dicts:      {dict_bytes / 2**20:8.1f} MiB ({dict_bytes / count:,.0f} B/product)")
+    print(f"ProductSummary:     {summary_bytes / 2**20:8.1f} MiB ({summary_bytes / count:,.0f} B/product)")
+    print(f"reduction:          {dict_bytes / summary_bytes:8.1f}x")
+    return summaries
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000)
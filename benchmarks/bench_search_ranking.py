@@ -0,0 +1,73 @@
+"""
+Latency of a ranked spotlight query (top 5 results) at several catalog sizes:
+
+- scan: the original spotlight, counting the query in every product's JSON,
+  adding fixed bonuses for name, category and tag matches and sorting them all
+- BM25, full sort: utils.search_index.SearchIndex.rank() ordering every match
+- BM25, heap top-k: the same scores with only the best 5 selected by a heap
+
+    python -m benchmarks.bench_search_ranking [count ...]
+"""
+import sys
+import json
+import time
+
+from benchmarks.synthetic_catalog import make_catalog
+from utils.product_summary import ProductSummary
+from utils.search_index import SearchIndex
+
+QUERIES = ['hoodie', 'black cotton', 'breathable training', 'sporty activewear', 'teal wool jacket']
+LIMIT = 5
+ROUNDS = 10
+
+
+def timed(label, query):
+    """Mean time per query over QUERIES; returns the results of the last round."""
+    for text in QUERIES:
+        query(text)
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        results = [query(text) for text in QUERIES]
+    elapsed = (time.perf_counter() - start) / (ROUNDS * len(QUERIES))
+    print(f"{label:<18} {elapsed * 1000:9.2f} ms/query")
+    return elapsed, results
+
+
+def main(counts=(10_000, 100_000)):
+    for count in counts:
+        products = make_catalog(count)
+        documents = [(product, json.dumps(product).lower()) for product in products]
+        index = SearchIndex(ProductSummary.from_product(product) for product in products)
+
+        def scan(text):
+            query = text.lower()
+            results = []
+            for product, document in documents:
+                relevance = document.count(query)
+                if not relevance:
+                    continue
+                if product['product_name'].lower().startswith(query):
+                    relevance += 10
+                if product['category'].lower() == query:
+                    relevance += 5
+                relevance += 3 * sum(tag.lower() == query for tag in product['tags'])
+                results.append((product['product_id'], relevance))
+            results.sort(key=lambda result: result[1], reverse=True)
+            return results[:LIMIT]
+
+        def full_sort(text):
+            return index.rank(text)[:LIMIT]
+
+        def top_k(text):
+            return index.rank(text, limit=LIMIT)
+
+        print(f"products: {count:,}   queries: {', '.join(QUERIES)}")
+        scanned, _ = timed('scan', scan)
+        sorted_, expected = timed('BM25, full sort', full_sort)
+        heap, results = timed('BM25, heap top-k', top_k)
+        assert results == expected, "heap selection ranked differently from the full sort"
+        print(f"speedup: {scanned / heap:.1f}x over the scan, {sorted_ / heap:.1f}x over the full sort\n")
+
+
+if __name__ == '__main__':
+    main([int(count) for count in sys.argv[1:]] or (10_000, 100_000))
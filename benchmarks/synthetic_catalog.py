@@ -0,0 +1,77 @@
+"""
+Synthetic product records shaped like the response/*.json files, for benchmarks.
+
+Run benchmarks from the repository root, e.g.:
+
+    python -m benchmarks.bench_product_summary
+"""
+import json
+import random
+
+CATEGORIES = ['Hoodies', 'Leggings', 'T-Shirts', 'Jackets', 'Shorts', 'Sneakers', 'Bags', 'Accessories']
+NOUNS = ['Hoodie', 'Legging', 'Tee', 'Jacket', 'Short', 'Sneaker', 'Backpack', 'Cap', 'Jogger', 'Tank']
+ADJECTIVES = ['Ultra', 'Core', 'Flex', 'Aero', 'Thermal', 'Classic', 'Pro', 'Essential', 'Studio', 'Trail']
+COLORS = ['red', 'blue', 'green', 'black', 'white', 'navy', 'gray', 'pink', 'beige', 'teal']
+MATERIALS = ['cotton', 'polyester', 'nylon', 'wool', 'leather', 'linen', 'canvas', 'rubber']
+STYLES = ['casual', 'sporty', 'modern', 'classic', 'urban', 'minimalist', 'retro']
+AUDIENCES = ['Runners', 'Gym goers', 'Students', 'Commuters', 'Yoga practitioners', 'Hikers']
+WORDS = ('breathable lightweight moisture wicking stretch durable soft comfortable everyday training '
+         'performance recycled seamless relaxed tapered cropped insulated water resistant reflective').split()
+
+
+def _sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def make_product(index, rng):
+    """Build one synthetic product record."""
+    product_id = f"2025{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}{index:06d}"
+    color = rng.choice(COLORS)
+    material = rng.choice(MATERIALS)
+    style = rng.choice(STYLES)
+    name = f"{rng.choice(ADJECTIVES)} {color.title()} {rng.choice(NOUNS)} {index}"
+    images = [f"raw/{product_id}_image{i}.jpg" for i in range(rng.randint(1, 5))]
+    return {
+        'product_id': product_id,
+        'product_name': name,
+        'category': rng.choice(CATEGORIES),
+        'price': rng.choice(['$', '', 'USD ']) + f"{rng.randint(10, 250)}.{rng.randint(0, 99):02d}",
+        'short_description': _sentence(rng, 16),
+        'detailed_description': ' '.join(_sentence(rng, 20) for _ in range(8)),
+        'specifications': [f"{rng.randint(50, 100)}% {material}", f"{style.title()} fit",
+                           'Machine washable', _sentence(rng, 6)],
+        'tags': [color, material, style] + rng.sample(WORDS, 5),
+        'seo_keywords': [f"{color} {material} {rng.choice(NOUNS).lower()}", f"{style} activewear",
+                         f"{rng.choice(WORDS)} {rng.choice(NOUNS).lower()}"],
+        'target_audience': rng.sample(AUDIENCES, 2),
+        'colors': [color],
+        'materials': [material],
+        'styles': [style],
+        'persona_descriptions': {
+            'athleisure_enthusiast': ' '.join(_sentence(rng, 18) for _ in range(3)),
+            'performance_athlete': ' '.join(_sentence(rng, 18) for _ in range(3)),
+            'value_conscious_buyer': 'N/A',
+        },
+        'image_features': {
+            'colors': [color, rng.choice(COLORS)],
+            'product_type': rng.choice(NOUNS).lower(),
+            'materials': [material],
+            'style': [style],
+            'distinctive_elements': rng.sample(WORDS, 3),
+        },
+        'image_urls': [f"/raw/{path[len('raw/'):]}" for path in images],
+        'images': images,
+        'raw_images': images,
+        'creation_date': f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d} 12:00:00",
+    }
+
+
+def make_catalog(count, seed=42):
+    """Build count synthetic products with a fixed seed."""
+    rng = random.Random(seed)
+    return [make_product(index, rng) for index in range(count)]
+
+
+def make_catalog_json(count, seed=42):
+    """Synthetic products serialized the way the app writes response files."""
+    return [json.dumps(product, indent=2) for product in make_catalog(count, seed)]
@@ -0,0 +1,19 @@
+import pytest
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path / 'response')
+
+
+@pytest.fixture
+def client(directory, monkeypatch):
+    """Test client of the app, serving a fresh catalog in directory."""
+    import app
+    from utils.versioned_cache import VersionedLRUCache
+    from tests.helpers import open_store
+
+    monkeypatch.setattr(app, 'product_store', open_store(directory))
+    monkeypatch.setattr(app, 'catalog_selection_cache', VersionedLRUCache(maxsize=256))
+    monkeypatch.setattr(app, 'spotlight_cache', VersionedLRUCache(maxsize=1024, ttl=600))
+    return app.app.test_client()
@@ -0,0 +1,24 @@
+from utils.product_store import ProductStore
+
+
+def make_product(number, **fields):
+    product = {
+        'product_id': f"20250301{number:06d}",
+        'product_name': f"Hoodie {number}",
+        'category': 'Tops',
+        'price': '$49.99',
+        'tags': ['red', 'casual'],
+        'short_description': 'A red cotton hoodie',
+        'detailed_description': 'Long description ' * 20,
+        'specifications': ['100% cotton'],
+        'seo_keywords': ['red hoodie'],
+    }
+    product.update(fields)
+    return product
+
+
+def open_store(directory):
+    """A store as a separate worker process would have it: its own journal descriptor and caches."""
+    store = ProductStore(directory)
+    store.load()
+    return store
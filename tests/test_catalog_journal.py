@@ -0,0 +1,130 @@
+import os
+import time
+
+from utils import catalog_paths
+from utils import json_codec
+from utils.catalog_journal import CatalogJournal
+from utils.catalog_watcher import PollingWatcher
+
+from tests.helpers import make_product, open_store
+
+
+def test_replay_restores_puts_patches_and_deletes(directory):
+    writer = open_store(directory)
+    for number in range(3):
+        writer.put(make_product(number))
+    writer.update(make_product(0)['product_id'], lambda p: p.update(product_name='Renamed', detailed_description='New'))
+    writer.delete(make_product(1)['product_id'])
+
+    reader = open_store(directory)
+    assert sorted(p['product_id'] for p in reader.list()) == [make_product(0)['product_id'],
+                                                              make_product(2)['product_id']]
+    renamed = reader.get(make_product(0)['product_id'])
+    assert renamed['product_name'] == 'Renamed'
+    assert renamed['detailed_description'] == 'New'
+    assert reader.get(make_product(1)['product_id']) is None
+
+
+def test_follows_writes_of_another_process(directory):
+    writer, reader = open_store(directory), open_store(directory)
+    writer.put(make_product(0))
+    assert reader.get(make_product(0)['product_id'])['product_name'] == 'Hoodie 0'
+    writer.update(make_product(0)['product_id'], lambda p: p.update(price='$10'))
+    assert reader.get(make_product(0)['product_id'])['price'] == '$10'
+
+
+def test_reloads_after_compaction_by_another_process(directory):
+    writer, reader = open_store(directory), open_store(directory)
+    writer.put(make_product(0))
+    assert reader.get(make_product(0)['product_id']) is not None
+
+    writer.put(make_product(1))
+    writer.compact()
+    writer.put(make_product(2))
+    writer.delete(make_product(0)['product_id'])
+
+    assert sorted(p['product_id'] for p in reader.list()) == [make_product(1)['product_id'],
+                                                              make_product(2)['product_id']]
+    # The reader's own writes go to the new journal
+    reader.put(make_product(3))
+    assert writer.get(make_product(3)['product_id']) is not None
+    assert len(open_store(directory).list()) == 3
+
+
+def test_torn_trailing_line_is_skipped_and_terminated(directory):
+    writer = open_store(directory)
+    writer.put(make_product(0))
+    journal = CatalogJournal(directory)
+    # A writer crashed in the middle of a record
+    with open(journal.journal_path, 'ab') as f:
+        f.write(b'{"op": "put", "product": {"product_id": "2025')
+
+    reader = open_store(directory)
+    assert [p['product_id'] for p in reader.list()] == [make_product(0)['product_id']]
+
+    # The next append starts on a new line, so both records after the torn one are readable
+    reader.put(make_product(1))
+    reader.put(make_product(2))
+    assert len(open_store(directory).list()) == 3
+
+
+def test_tail_leaves_an_unfinished_line_for_later(directory):
+    writer, reader = open_store(directory), open_store(directory)
+    record = json_codec.dumps_bytes({'op': 'put', 'product': make_product(0)})
+    journal = CatalogJournal(directory)
+    with open(journal.journal_path, 'ab') as f:
+        f.write(record[:20])
+    assert reader.list() == []
+    with open(journal.journal_path, 'ab') as f:
+        f.write(record[20:] + b'\n')
+    assert [p['product_id'] for p in reader.list()] == [make_product(0)['product_id']]
+    assert writer.get(make_product(0)['product_id']) is not None
+
+
+def test_edited_export_file_is_journaled(directory):
+    store = open_store(directory)
+    product_id = make_product(0)['product_id']
+    store.put(make_product(0))
+    store.version()
+
+    path = catalog_paths.product_file_path(product_id, directory)
+    exported = json_codec.read_file(path)
+    exported['product_name'] = 'Edited by hand'
+    json_codec.write_file(path, exported)
+    added = make_product(1, product_name='Dropped in')
+    json_codec.write_file(catalog_paths.product_file_path(added['product_id'], directory), added)
+
+    store.version()
+    assert store.get(product_id)['product_name'] == 'Edited by hand'
+    # Journaled, so a fresh process and the listing index see the edits too
+    fresh = open_store(directory)
+    assert fresh.get(product_id)['product_name'] == 'Edited by hand'
+    assert fresh.get(added['product_id'])['product_name'] == 'Dropped in'
+    assert {s.product_name for s in fresh.list_summaries()} == {'Edited by hand', 'Dropped in'}
+
+    os.remove(path)
+    store.version()
+    assert open_store(directory).get(product_id) is None
+
+
+def test_own_exports_are_not_journaled_again(directory):
+    store = open_store(directory)
+    store.version()
+    store.put(make_product(0))
+    journal_path = CatalogJournal(directory).journal_path
+    size = os.path.getsize(journal_path)
+    store.version()
+    store.get(make_product(0)['product_id'])
+    assert os.path.getsize(journal_path) == size
+
+
+def test_polling_watcher_reports_changed_and_deleted_files(tmp_path):
+    (tmp_path / '20250301').mkdir()
+    (tmp_path / '20250301' / 'a.json').write_text('{}')
+    watcher = PollingWatcher(str(tmp_path), min_interval=0)
+    time.sleep(0.01)
+    (tmp_path / '20250301' / 'b.json').write_text('{}')
+    (tmp_path / '20250301' / 'a.json').unlink()
+    (tmp_path / '20250301' / 'b.details').write_text('{}')
+    assert watcher.poll() == ({'b'}, {'a'})
+    assert watcher.poll() == (set(), set())
@@ -0,0 +1,30 @@
+import os
+
+from utils.catalog_version import CatalogVersion
+
+from tests.helpers import make_product, open_store
+
+
+def test_versions_are_not_repeated_after_the_file_is_lost(directory):
+    store = open_store(directory)
+    seen = {store.version()}
+    for number in range(3):
+        store.put(make_product(number))
+        seen.add(store.version())
+    assert len(seen) == 4
+
+    os.remove(CatalogVersion(directory).path)
+    assert store.version() not in seen
+    seen.add(store.version())
+    store.put(make_product(3))
+    assert store.version() not in seen
+
+
+def test_unreadable_file_starts_a_new_epoch(directory):
+    store = open_store(directory)
+    store.put(make_product(0))
+    version = store.version()
+    with open(CatalogVersion(directory).path, 'wb') as f:
+        f.write(b'{"epoch": ')
+    assert store.version() != version
+    assert open_store(directory).version() == store.version()
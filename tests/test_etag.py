@@ -0,0 +1,19 @@
+import app
+from tests.helpers import make_product
+
+
+def test_matching_etag_gets_304_until_a_product_is_written(client):
+    app.product_store.put(make_product(0))
+    etag = client.get('/api/catalog').headers['ETag']
+    assert client.get('/api/catalog', headers={'If-None-Match': etag}).status_code == 304
+    app.product_store.put(make_product(1))
+    response = client.get('/api/catalog', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+def test_build_fingerprint_covers_search_field_weights(monkeypatch):
+    fingerprint = app._build_fingerprint()
+    assert app._build_fingerprint() == fingerprint
+    monkeypatch.setattr(app, 'SEARCH_FIELD_WEIGHTS', {**app.SEARCH_FIELD_WEIGHTS, 'product_name': 10.0})
+    assert app._build_fingerprint() != fingerprint
@@ -0,0 +1,48 @@
+from utils.facet_index import FACET_ATTRIBUTES, FacetIndex
+from utils.product_summary import ProductSummary
+
+from tests.helpers import make_product
+
+
+def summary(number, **fields):
+    return ProductSummary.from_product(make_product(number, **fields))
+
+
+def members(index):
+    """Product IDs under every facet value, independent of the ordinals."""
+    return {facet: {value: index.to_ids(index.bits(facet, value)) for value in index.values(facet)}
+            for facet in FACET_ATTRIBUTES}
+
+
+def test_updated_matches_a_rebuilt_index():
+    summaries = [summary(0), summary(1, category='Bottoms', tags=['blue']), summary(2, target_audience=['Runners'])]
+    index = FacetIndex(summaries)
+    changed = summary(1, category='Tops', tags=['black', 'wool'])
+    added = summary(3, category='Outerwear', tags=['green', 'green'])
+
+    updated = index.updated([summaries[0].product_id, changed.product_id], [changed, added])
+    rebuilt = FacetIndex([changed, summaries[2], added])
+    assert members(updated) == members(rebuilt)
+    assert updated.to_ids(updated.all) == rebuilt.to_ids(rebuilt.all)
+    assert len(updated) == 3
+    assert updated.to_ids(updated.from_ids([changed.product_id, 'missing'])) == {changed.product_id}
+
+
+def test_updated_leaves_the_original_alone():
+    summaries = [summary(0), summary(1, category='Bottoms')]
+    index = FacetIndex(summaries)
+    before = members(index)
+
+    updated = index.updated([summaries[1].product_id], [summary(2, category='Outerwear')])
+    assert members(index) == before
+    assert updated.generation != index.generation
+    assert 'Bottoms' not in updated.values('category')
+
+
+def test_updated_reuses_the_ordinals_of_removed_products():
+    index = FacetIndex([summary(number) for number in range(4)])
+    width = index.all.bit_length()
+    for number in range(4, 20):
+        index = index.updated([summary(number - 4).product_id], [summary(number)])
+    assert index.all.bit_length() == width
+    assert index.to_ids(index.all) == {summary(number).product_id for number in range(16, 20)}
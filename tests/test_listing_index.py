@@ -0,0 +1,111 @@
+import os
+
+from utils import json_codec
+from utils.catalog_journal import CatalogJournal
+from utils.listing_index import ListingIndex
+from utils.product_store import ProductStore
+
+from tests.helpers import make_product, open_store
+
+
+def index_signature(directory):
+    stat = os.stat(ListingIndex(directory).path)
+    return (stat.st_ino, stat.st_mtime_ns)
+
+
+def test_cache_only_write_keeps_index_and_version(directory):
+    store = open_store(directory)
+    product_id = make_product(0)['product_id']
+    store.put(make_product(0))
+    signature, version = index_signature(directory), store.version()
+
+    store.update(product_id, lambda p: p.update(image_features={'colors': ['red']}), cache_only=True)
+    assert index_signature(directory) == signature
+    assert store.version() == version
+    assert store.get(product_id)['image_features'] == {'colors': ['red']}
+
+
+def test_write_outside_the_listing_fields_bumps_version_only(directory):
+    store = open_store(directory)
+    product_id = make_product(0)['product_id']
+    store.put(make_product(0))
+    signature, version = index_signature(directory), store.version()
+
+    store.update(product_id, lambda p: p.update(persona_descriptions={'athleisure_enthusiast': 'Comfy'}))
+    assert index_signature(directory) == signature
+    bumped = store.version()
+    assert bumped != version
+
+    store.update(product_id, lambda p: p.update(product_name='Renamed'))
+    assert index_signature(directory) != signature
+    assert store.version() not in (version, bumped)
+    assert [s.product_name for s in store.list_summaries()] == ['Renamed']
+
+
+def test_other_process_checks_writes_that_skipped_the_index(directory):
+    first, second = open_store(directory), open_store(directory)
+    first.put(make_product(0))
+    first.update(make_product(0)['product_id'], lambda p: p.update(image_features={}), cache_only=True)
+    second.put(make_product(1))
+    assert {s.product_name for s in first.list_summaries()} == {'Hoodie 0', 'Hoodie 1'}
+    # A fresh process finds the index up to date instead of rebuilding it
+    signature = index_signature(directory)
+    assert len(open_store(directory).list_summaries()) == 2
+    assert index_signature(directory) == signature
+
+
+def test_load_applies_writes_missing_from_the_index(directory):
+    store = open_store(directory)
+    store.put(make_product(0))
+    # A writer crashed after journaling a rename but before updating the index
+    journal = CatalogJournal(directory)
+    with open(journal.journal_path, 'ab') as f:
+        f.write(json_codec.dumps_bytes({'op': 'patch', 'product_id': make_product(0)['product_id'],
+                                        'set': {'product_name': 'Crashed rename'}, 'unset': []}) + b'\n')
+    assert [s.product_name for s in open_store(directory).list_summaries()] == ['Crashed rename']
+
+
+def test_compaction_keeps_index_in_step(directory):
+    store = ProductStore(directory, compact_every=3)
+    store.load()
+    for number in range(5):
+        store.put(make_product(number))
+        store.update(make_product(number)['product_id'], lambda p: p.update(image_features={}), cache_only=True)
+    signature = index_signature(directory)
+    assert len(open_store(directory).list_summaries()) == 5
+    assert index_signature(directory) == signature
+
+
+def ranked_ids(index, query):
+    return [product_id for product_id, _ in index.rank(query)]
+
+
+def test_other_process_updates_its_search_index_and_orders(directory):
+    writer, reader = open_store(directory), open_store(directory)
+    writer.put(make_product(0, product_name='Trail Jacket'))
+    index = reader.search_index()
+    assert [s.product_name for s in reader.list_summaries(sort='name_asc')] == ['Trail Jacket']
+
+    writer.put(make_product(1, product_name='Rain Jacket'))
+    writer.delete(make_product(0)['product_id'])
+    writer.put(make_product(2, product_name='Alpine Jacket'))
+    assert reader.search_index() is index
+    assert set(ranked_ids(index, 'jacket')) == {make_product(1)['product_id'], make_product(2)['product_id']}
+    assert [s.product_name for s in reader.list_summaries(sort='name_asc')] == ['Alpine Jacket', 'Rain Jacket']
+
+
+def test_other_process_updates_its_facet_index(directory, monkeypatch):
+    writer, reader = open_store(directory), open_store(directory)
+    writer.put(make_product(0, category='Tops'))
+    facets = reader.facet_index()
+    assert facets.values('category') == ['Tops']
+
+    def rebuild(summaries):
+        raise AssertionError('facet index rebuilt')
+    monkeypatch.setattr('utils.listing_index.FacetIndex', rebuild)
+    writer.put(make_product(1, category='Bottoms'))
+    writer.delete(make_product(0)['product_id'])
+    updated = reader.facet_index()
+    assert updated.generation != facets.generation
+    assert updated.values('category') == ['Bottoms']
+    assert updated.to_ids(updated.all) == {make_product(1)['product_id']}
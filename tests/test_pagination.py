@@ -0,0 +1,99 @@
+import pytest
+
+from utils import pagination
+from utils.pagination import SortedListing, decode_cursor, encode_cursor
+from utils.product_summary import ProductSummary
+
+from tests.helpers import make_product, open_store
+
+NAMES = ['Delta', 'alpha', 'Charlie', 'bravo', 'Echo', 'alpha']
+# Product numbers in each listing order; equal names are ordered by product ID
+ORDERS = {
+    'newest': [5, 4, 3, 2, 1, 0],
+    'name_asc': [1, 5, 3, 2, 0, 4],
+    'name_desc': [4, 0, 2, 3, 5, 1],
+}
+
+
+def make_summaries():
+    return [ProductSummary.from_product(make_product(number, product_name=name))
+            for number, name in enumerate(NAMES)]
+
+
+def walk(listing, per_page, sort, ids=None):
+    """Every page of a listing, following a cursor from the last product of each page."""
+    pages, after = [], None
+    while True:
+        page = listing.page(ids=ids, limit=per_page, after=after)
+        if not page:
+            return pages
+        pages.append([summary.product_id for summary in page])
+        after = decode_cursor(encode_cursor(page[-1], sort), sort)
+
+
+def test_cursor_round_trip():
+    summary = make_summaries()[0]
+    assert decode_cursor(encode_cursor(summary, 'name_asc'), 'name_asc') == ('delta', summary.product_id)
+
+
+@pytest.mark.parametrize('cursor', ['', 'not base64!', 'bm90IGpzb24', encode_cursor(make_summaries()[0], 'newest')])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor, 'name_asc')
+
+
+@pytest.mark.parametrize('sort', ['newest', 'name_asc', 'name_desc'])
+def test_cursor_pages_cover_the_listing_once_in_order(sort):
+    expected = [make_product(number)['product_id'] for number in ORDERS[sort]]
+    pages = walk(SortedListing(make_summaries(), sort), 4, sort)
+    assert [len(page) for page in pages] == [4, 2]
+    assert sum(pages, []) == expected
+
+
+@pytest.mark.parametrize('ids', [{make_product(1)['product_id']}, {make_product(n)['product_id'] for n in range(5)}])
+def test_filtered_pages_keep_listing_order(ids):
+    listing = SortedListing(make_summaries(), 'name_asc')
+    expected = [make_product(number)['product_id'] for number in ORDERS['name_asc']
+                if make_product(number)['product_id'] in ids]
+    assert listing.page(ids=ids) == [s for s in listing.page() if s.product_id in ids]
+    assert sum(walk(listing, 2, 'name_asc', ids), []) == expected
+    assert [s.product_id for s in listing.page(ids=ids, offset=1, limit=2)] == expected[1:3]
+
+
+def test_store_pages_by_offset_and_cursor(directory):
+    store = open_store(directory)
+    for number, name in enumerate(NAMES):
+        store.put(make_product(number, product_name=name))
+    first = store.page_summaries(sort='name_desc', limit=3)
+    second = store.page_summaries(sort='name_desc', limit=3,
+                                  after=pagination.sort_position(first[-1], 'name_desc'))
+    assert [s.product_name for s in first + second] == ['Echo', 'Delta', 'Charlie', 'bravo', 'alpha', 'alpha']
+    assert store.page_summaries(sort='name_desc', offset=3, limit=3) == second
+
+
+PRICES = ['$30', '12.50 EUR', 'on request', '$30', '1,299.00', '$5']
+
+
+def make_priced_summaries():
+    return [ProductSummary.from_product(make_product(number, price=price))
+            for number, price in enumerate(PRICES)]
+
+
+@pytest.mark.parametrize('sort, order', [('price_asc', [5, 1, 0, 3, 4, 2]), ('price_desc', [4, 0, 3, 1, 5, 2])])
+def test_price_sorts_list_unpriced_products_last(sort, order):
+    expected = [make_product(number)['product_id'] for number in order]
+    assert sum(walk(SortedListing(make_priced_summaries(), sort), 4, sort), []) == expected
+
+
+def test_updated_listing_matches_a_rebuilt_one():
+    summaries = make_priced_summaries()
+    listing = SortedListing(summaries, 'price_asc')
+    changed = [ProductSummary.from_product(make_product(1, price='$2000')),
+               ProductSummary.from_product(make_product(9, price='$1'))]
+    removed = [make_product(1)['product_id'], make_product(4)['product_id']]
+
+    updated = listing.updated(removed, changed)
+    kept = [s for s in summaries if s.product_id not in removed]
+    assert updated.page() == SortedListing(kept + changed, 'price_asc').page()
+    # The original listing is left as it was
+    assert listing.page() == SortedListing(summaries, 'price_asc').page()
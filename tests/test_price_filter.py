@@ -0,0 +1,81 @@
+import pytest
+
+from utils.pagination import SortedListing
+from utils.product_summary import ProductSummary
+from utils.sqlite_catalog import SQLiteProductStore
+
+from tests.helpers import make_product, open_store
+
+PRICES = ['$30', '12.50 EUR', 'on request', '$30', '1,299.00', '$5']
+
+
+def ids(*numbers):
+    return {make_product(number)['product_id'] for number in numbers}
+
+
+@pytest.fixture(params=['json', 'sqlite'])
+def store(request, directory, tmp_path):
+    store = open_store(directory) if request.param == 'json' else SQLiteProductStore(str(tmp_path / 'catalog.db'))
+    for number, price in enumerate(PRICES):
+        store.put(make_product(number, price=price))
+    return store
+
+
+@pytest.mark.parametrize('low, high, expected', [
+    (10, 30, ids(0, 1, 3)),
+    (30, 30, ids(0, 3)),
+    (None, 12.5, ids(1, 5)),
+    (31, None, ids(4)),
+    (None, None, ids(0, 1, 3, 4, 5)),
+    (40, 50, set()),
+])
+def test_listing_between_bounds(low, high, expected):
+    summaries = [ProductSummary.from_product(make_product(number, price=price))
+                 for number, price in enumerate(PRICES)]
+    listing = SortedListing(summaries, 'price_asc')
+    assert {summary.product_id for summary in listing.between(low, high)} == expected
+
+
+@pytest.mark.parametrize('low, high, expected', [
+    (10, 30, ids(0, 1, 3)),
+    (None, 12.5, ids(1, 5)),
+    (31, None, ids(4)),
+    (None, None, ids(0, 1, 3, 4, 5)),
+])
+def test_store_price_range(store, low, high, expected):
+    assert store.price_range(low, high) == expected
+
+
+def test_price_range_follows_price_changes(store):
+    store.put(make_product(4, price='$20'))
+    assert store.price_range(10, 30) == ids(0, 1, 3, 4)
+    assert store.price_range(31, None) == set()
+
+
+@pytest.fixture
+def priced(client):
+    import app
+    for number, price in enumerate(PRICES):
+        app.product_store.put(make_product(number, price=price))
+    return client
+
+
+def test_catalog_api_filters_by_price(priced):
+    listing = priced.get('/api/catalog?min_price=10&max_price=30').get_json()
+    assert listing['total'] == 3
+    assert {product['product_id'] for product in listing['products']} == ids(0, 1, 3)
+
+
+@pytest.mark.parametrize('bounds', ['min_price=abc', 'max_price=-5', 'min_price=inf', 'min_price=$10'])
+@pytest.mark.parametrize('path', ['/api/catalog', '/api/products'])
+def test_api_rejects_bad_price_bounds(priced, path, bounds):
+    response = priced.get(f"{path}?{bounds}")
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_catalog_drops_bad_price_bounds(priced):
+    response = priced.get('/catalog?category=Tops&min_price=abc&max_price=30')
+    assert response.status_code == 302
+    assert 'min_price' not in response.location
+    assert 'category=Tops' in response.location and 'max_price=30' in response.location
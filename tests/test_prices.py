@@ -0,0 +1,23 @@
+import pytest
+
+from utils.prices import parse_price
+
+
+@pytest.mark.parametrize('price, value', [
+    ('$49.99', 49.99),
+    ('49,99 EUR', 49.99),
+    ('1,299.00', 1299.0),
+    ('1.299,50 €', 1299.5),
+    ('1,299', 1299.0),
+    ('USD 30', 30.0),
+    ('12.5', 12.5),
+    (12, 12.0),
+    (7.25, 7.25),
+])
+def test_parse_price(price, value):
+    assert parse_price(price) == value
+
+
+@pytest.mark.parametrize('price', [None, '', 'Free', 'N/A', True])
+def test_price_without_a_number(price):
+    assert parse_price(price) is None
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+import app
+from tests.helpers import make_product
+
+CATEGORIES = ['Tops', 'Shoes', 'Tops', 'Tops', 'Shoes']
+
+
+@pytest.fixture
+def products(client):
+    products = [make_product(number, category=category) for number, category in enumerate(CATEGORIES)]
+    for product in products:
+        app.product_store.put(product)
+    return products
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+
+def test_default_fields_are_the_listing_fields(client, products):
+    records = client.get('/api/products').get_json()['products']
+    assert [record['product_id'] for record in records] == [p['product_id'] for p in reversed(products)]
+    assert set(records[0]) <= set(app.SUMMARY_FIELDS)
+    assert 'detailed_description' not in records[0]
+
+
+def test_fields_project_records(client, products):
+    records = client.get('/api/products?fields=product_id,price,specifications,missing').get_json()['products']
+    assert records[0] == {'product_id': products[-1]['product_id'], 'price': '$49.99',
+                          'specifications': ['100% cotton']}
+
+
+def test_ndjson_streams_every_matching_product_in_batches(client, products, monkeypatch):
+    monkeypatch.setattr(app, 'EXPORT_BATCH_SIZE', 2)
+    response = client.get('/api/products?format=ndjson&category=Tops&sort=name_asc&fields=product_id')
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.is_streamed
+    assert response.headers['X-Total-Count'] == '3'
+    assert ndjson(response) == [{'product_id': products[number]['product_id']} for number in (0, 2, 3)]
+
+
+def test_paged_ndjson_sends_the_next_cursor(client, products):
+    first = client.get('/api/products?format=ndjson&per_page=3&cursor=&fields=product_id')
+    second = client.get(f"/api/products?format=ndjson&per_page=3&fields=product_id"
+                        f"&cursor={first.headers['X-Next-Cursor']}")
+    assert first.headers['X-Total-Count'] == '5'
+    assert 'X-Next-Cursor' not in second.headers
+    ids = [record['product_id'] for record in ndjson(first) + ndjson(second)]
+    assert ids == [p['product_id'] for p in reversed(products)]
+
+
+def test_invalid_cursor_is_a_bad_request(client, products):
+    assert client.get('/api/products?cursor=nonsense').status_code == 400
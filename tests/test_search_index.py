@@ -0,0 +1,79 @@
+import pytest
+
+from utils.product_summary import ProductSummary
+from utils.search_index import SearchIndex
+
+from tests.helpers import make_product
+
+
+def summary(number, **fields):
+    return ProductSummary.from_product(make_product(number, tags=[], seo_keywords=[], **fields))
+
+
+@pytest.fixture
+def index():
+    return SearchIndex([
+        summary(1, product_name='Trail Jacket', short_description='A light shell'),
+        summary(2, product_name='Fleece Hoodie', short_description='Pairs with any trail jacket'),
+        summary(3, product_name='Rain Jacket', short_description='Sealed seams'),
+    ])
+
+
+def ranked_ids(index, query, **kwargs):
+    return [product_id for product_id, _ in index.rank(query, **kwargs)]
+
+
+def test_matches_contain_every_query_term(index):
+    assert ranked_ids(index, 'trail jacket') == [make_product(1)['product_id'], make_product(2)['product_id']]
+    assert ranked_ids(index, 'trail seams') == []
+
+
+def test_name_matches_outrank_description_matches(index):
+    assert ranked_ids(index, 'trail') == [make_product(1)['product_id'], make_product(2)['product_id']]
+
+
+def test_field_weights_change_the_order(index):
+    weights = {'product_name': 0.5, 'short_description': 5.0}
+    assert ranked_ids(index, 'trail', weights=weights) == [make_product(2)['product_id'],
+                                                          make_product(1)['product_id']]
+
+
+def test_shorter_fields_rank_higher():
+    index = SearchIndex([summary(1, product_name='Jacket with a hood and pockets'), summary(2, product_name='Jacket')])
+    assert ranked_ids(index, 'jacket') == [make_product(2)['product_id'], make_product(1)['product_id']]
+
+
+def test_limit_keeps_the_best_and_ties_go_to_the_newer_product(index):
+    assert ranked_ids(index, 'jacket', limit=1) == [make_product(3)['product_id']]
+    assert ranked_ids(index, 'jacket', limit=1) == ranked_ids(index, 'jacket')[:1]
+
+
+def test_removed_products_are_not_ranked(index):
+    index.remove(make_product(1)['product_id'])
+    assert ranked_ids(index, 'trail') == [make_product(2)['product_id']]
+
+
+def make_index(*names):
+    return SearchIndex(ProductSummary.from_product(make_product(number, product_name=name))
+                       for number, name in enumerate(names))
+
+
+def test_corrections_cover_transpositions():
+    index = make_index('Black jacket', 'White shirt')
+    assert index.corrections('jakcet') == [('jacket', 1)]
+    assert index.corrections('jacekt') == [('jacket', 1)]
+    assert index.corrections('shrit') == [('shirt', 1)]
+
+
+def test_misspelled_query_ranks_the_intended_product():
+    index = make_index('Black jacket', 'White shirt')
+    assert [product_id for product_id, _ in index.rank('jakcet', fuzzy=True)] == [make_product(0)['product_id']]
+
+
+def test_capped_expansion_keeps_the_most_frequent_terms():
+    names = [f"Hoa{letter}" for letter in 'abcdefghijklmnopqrstuvwxyz'] + ['Hob', 'Hoc', 'Hod', 'Hoe', 'Hof', 'Hog']
+    index = make_index(*names, 'Hoodie', 'Hoodie', 'Hoodie')
+    expansions = index.expand('ho')
+    assert len(expansions) == 32
+    assert expansions[0] == 'hoodie'
+    assert index.expand('hood') == ['hoodie']
@@ -0,0 +1,78 @@
+import os
+
+from utils import catalog_paths
+from utils import json_codec
+from utils.catalog_journal import CatalogJournal
+from utils.product_details import split_details
+
+from tests.helpers import make_product, open_store
+
+
+def test_search_text_stays_out_of_records_and_exports(directory):
+    store = open_store(directory)
+    product_id = make_product(0)['product_id']
+    store.put(make_product(0, detailed_description='Brushed fleece lining'))
+
+    assert store.match_text('fleece lining') == {product_id: 1}
+    assert 'search_text' not in store.get(product_id)
+    assert 'search_text' not in store.update(product_id, lambda p: p.update(price='$10'))
+    assert 'search_text' not in json_codec.read_file(catalog_paths.product_file_path(product_id, directory))
+    for record in CatalogJournal(directory).open():
+        assert 'search_text' not in record.get('product', record.get('set', {}))
+
+
+def test_matches_detail_fields_changed_by_another_process(directory):
+    first, second = open_store(directory), open_store(directory)
+    product_id = make_product(0)['product_id']
+    first.put(make_product(0))
+    assert first.match_text('merino') == {}
+
+    second.update(product_id, lambda p: p.update(detailed_description='Merino wool blend'))
+    assert first.match_text('merino') == {product_id: 1}
+
+
+def test_search_text_stored_by_earlier_versions_is_dropped(directory):
+    store = open_store(directory)
+    product_id = make_product(0)['product_id']
+    store.put(make_product(0))
+    with open(CatalogJournal(directory).journal_path, 'ab') as f:
+        f.write(json_codec.dumps_bytes({'op': 'patch', 'product_id': product_id,
+                                        'set': {'search_text': 'stale'}, 'unset': []}) + b'\n')
+
+    fresh = open_store(directory)
+    assert 'search_text' not in fresh.get(product_id)
+    assert fresh.match_text('stale') == {}
+
+
+def forget_details(directory, product_id):
+    """Remove a product's detail side record, so only a stored search text can match its details."""
+    os.remove(catalog_paths.details_file_path(product_id, directory))
+
+
+def test_search_text_is_stored_through_reloads_and_compaction(directory):
+    writer = open_store(directory)
+    product_id = make_product(0)['product_id']
+    writer.put(make_product(0, detailed_description='Brushed fleece lining'))
+    writer.update(product_id, lambda p: p.update(specifications=['Merino wool']))
+    forget_details(directory, product_id)
+
+    assert open_store(directory).match_text('fleece lining') == {product_id: 1}
+    writer.compact()
+    reader = open_store(directory)
+    assert reader.match_text('merino') == {product_id: 1}
+    assert 'search_text' not in reader.get(product_id)
+
+
+def test_backfill_stores_the_search_text_of_earlier_products(directory):
+    product_id = make_product(0)['product_id']
+    core, details = split_details(make_product(0, detailed_description='Brushed fleece lining'))
+    os.makedirs(os.path.dirname(catalog_paths.details_file_path(product_id, directory)))
+    json_codec.write_file(catalog_paths.details_file_path(product_id, directory), details)
+    # A snapshot written before search texts were stored: bare product records
+    with open(CatalogJournal(directory).snapshot_path, 'wb') as f:
+        f.write(json_codec.dumps_bytes(core) + b'\n')
+
+    assert open_store(directory).rebuild_search_text() == 1
+    assert all('search_text' in record for record in CatalogJournal(directory).read_snapshot())
+    forget_details(directory, product_id)
+    assert open_store(directory).match_text('fleece lining') == {product_id: 1}
@@ -0,0 +1,60 @@
+import pytest
+
+from utils import sqlite_catalog
+from utils.sqlite_catalog import SQLiteProductStore
+
+from tests.helpers import make_product
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'catalog.db')
+
+
+def ranked_ids(index, query):
+    return [product_id for product_id, _ in index.rank(query)]
+
+
+def test_search_index_follows_changed_rows(db_path):
+    writer, reader = SQLiteProductStore(db_path), SQLiteProductStore(db_path)
+    writer.put(make_product(0, product_name='Trail Jacket'))
+    index = reader.search_index()
+
+    writer.put(make_product(1, product_name='Rain Jacket'))
+    writer.update(make_product(0)['product_id'], lambda p: p.update(product_name='Trail Shell'))
+    assert reader.search_index() is index
+    assert ranked_ids(index, 'jacket') == [make_product(1)['product_id']]
+    assert ranked_ids(index, 'shell') == [make_product(0)['product_id']]
+
+    writer.delete(make_product(1)['product_id'])
+    assert reader.search_index() is index
+    assert ranked_ids(index, 'jacket') == []
+
+
+def test_search_index_is_rebuilt_when_the_change_log_was_pruned(db_path, monkeypatch):
+    monkeypatch.setattr(sqlite_catalog, 'CHANGE_LOG_SIZE', 2)
+    writer, reader = SQLiteProductStore(db_path), SQLiteProductStore(db_path)
+    writer.put(make_product(0, product_name='Trail Jacket'))
+    index = reader.search_index()
+    for number in range(1, 4):
+        writer.put(make_product(number, product_name=f"Jacket {number}"))
+
+    rebuilt = reader.search_index()
+    assert rebuilt is not index
+    assert len(ranked_ids(rebuilt, 'jacket')) == 4
+
+
+def test_facet_index_follows_changed_rows(db_path):
+    writer, reader = SQLiteProductStore(db_path), SQLiteProductStore(db_path)
+    writer.put(make_product(0, category='Tops'))
+    facets = reader.facet_index()
+
+    writer.put(make_product(1, category='Bottoms'))
+    writer.update(make_product(0)['product_id'], lambda p: p.update(category='Outerwear'))
+    updated = reader.facet_index()
+    assert updated.generation != facets.generation
+    assert updated.values('category') == ['Bottoms', 'Outerwear']
+    assert facets.values('category') == ['Tops']
+
+    writer.delete(make_product(1)['product_id'])
+    assert reader.facet_index().to_ids(reader.facet_index().all) == {make_product(0)['product_id']}
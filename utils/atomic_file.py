@@ -0,0 +1,77 @@
+import os
+import logging
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows; locking then only covers threads in this process
+    fcntl = None
+
+_fallback_lock = threading.RLock()
+
+
+def atomic_write_bytes(path, data):
+    """
+    Write data to path atomically.
+
+    The data goes to a temporary file in the same directory, is flushed to disk,
+    and then renamed over path with os.replace(), so readers see either the old
+    file or the new one and never a partially written file.
+
+    Args:
+        path (str): Destination file
+        data (bytes): File contents
+    """
+    directory = os.path.dirname(path) or '.'
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            # mkstemp creates the file 0600; product files are world-readable
+            if hasattr(os, 'fchmod'):
+                os.fchmod(f.fileno(), 0o644)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+@contextmanager
+def file_lock(path):
+    """
+    Hold an exclusive advisory lock for path while the block runs.
+
+    The lock is taken with fcntl.flock() on a separate lock file in a .locks
+    directory next to path, because atomic_write_bytes() replaces the file
+    itself. Only writers need the lock; readers can rely on atomic replacement.
+    Product writes all take it on the catalog journal (CatalogJournal.lock()),
+    not per product file, since every write appends to that journal.
+
+    Args:
+        path (str): File to lock
+    """
+    if fcntl is None:
+        with _fallback_lock:
+            yield
+        return
+
+    lock_directory = os.path.join(os.path.dirname(path) or '.', '.locks')
+    os.makedirs(lock_directory, exist_ok=True)
+    lock_path = os.path.join(lock_directory, f"{os.path.basename(path)}.lock")
+    with open(lock_path, 'a') as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            except OSError as e:
+                logging.error(f"Error releasing lock {lock_path}: {str(e)}")
@@ -0,0 +1,172 @@
+import os
+import logging
+
+from utils import json_codec
+from utils.atomic_file import atomic_write_bytes, file_lock
+
+SNAPSHOT_FILE = '_snapshot.ndjson'
+JOURNAL_FILE = '_journal.ndjson'
+
+
+def _parse_lines(data, path):
+    """Parse NDJSON bytes, skipping (and logging) lines that are not valid JSON."""
+    records = []
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(json_codec.loads(line))
+        except Exception as e:
+            logging.error(f"Skipping unreadable record in {path}: {str(e)}")
+    return records
+
+
+class CatalogJournal:
+    """
+    Append-only log of catalog changes and the snapshot it is compacted into.
+
+    Both files are NDJSON and live in the response directory. The journal holds
+    one change per line:
+
+        {"op": "put", "product": {...}, "search_text": "..."}
+        {"op": "patch", "product_id": "...", "set": {...}, "unset": [...], "search_text": "..."}
+        {"op": "delete", "product_id": "..."}
+
+    search_text is the product's normalized search text, kept beside the record
+    rather than in it; patches carry it only when it changed. The snapshot holds
+    one put record per product (snapshots written before it stored search texts
+    hold bare product records, which are read as puts without one).
+
+    Compaction writes a new snapshot and then replaces the journal with an empty
+    one. Replaying a journal on top of a snapshot that already contains it gives
+    the same catalog, so a crash between the two steps loses nothing.
+
+    Writers must hold lock(). Readers follow the journal with tail(), which reads
+    only the bytes appended since the previous call.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self.journal_path = os.path.join(directory, JOURNAL_FILE)
+        self.record_count = 0
+        self._fd = None
+        self._inode = None
+        self._offset = 0
+
+    def exists(self):
+        return os.path.exists(self.snapshot_path) or os.path.exists(self.journal_path)
+
+    def lock(self):
+        """Exclusive lock for appending to the journal and compacting it."""
+        return file_lock(self.journal_path)
+
+    def position(self):
+        """(inode, size) of the journal file, which changes with every append and compaction."""
+        stat = os.stat(self.journal_path)
+        return (stat.st_ino, stat.st_size)
+
+    def read_snapshot(self):
+        """Put records of the products in the snapshot, or an empty list if there is none."""
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        return [line if line.get('op') == 'put' and 'product' in line else {'op': 'put', 'product': line}
+                for line in _parse_lines(data, self.snapshot_path)]
+
+    def open(self):
+        """
+        (Re)open the journal and read all of it. The caller must hold lock().
+
+        Returns:
+            list: Change records in the journal, oldest first
+        """
+        self.close()
+        # Create the journal if it is missing so there is something to follow
+        os.close(os.open(self.journal_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644))
+        self._fd = os.open(self.journal_path, os.O_RDONLY | getattr(os, 'O_CLOEXEC', 0))
+        self._inode = os.fstat(self._fd).st_ino
+        self._offset = 0
+        self.record_count = 0
+        return self.tail()
+
+    def tail(self):
+        """
+        Read the records appended since the previous call.
+
+        Returns:
+            list or None: New change records, or None if the journal has not been
+                opened or was replaced by a compaction and must be reopened
+        """
+        if self._fd is None:
+            return None
+        try:
+            stat = os.stat(self.journal_path)
+        except FileNotFoundError:
+            return None
+        if stat.st_ino != self._inode:
+            return None
+        if stat.st_size <= self._offset:
+            return []
+        # pread keeps our own offset, so a descriptor inherited by a forked worker is safe to use
+        data = os.pread(self._fd, stat.st_size - self._offset, self._offset)
+        # A line still being written has no newline yet; leave it for the next call
+        end = data.rfind(b'\n') + 1
+        self._offset += end
+        records = _parse_lines(data[:end], self.journal_path)
+        self.record_count += len(records)
+        return records
+
+    def records_since(self, position):
+        """
+        Records appended to the current journal after a position() it had.
+
+        Args:
+            position (tuple): (inode, size) from position()
+
+        Returns:
+            list or None: Change records, oldest first, or None if the journal
+                was replaced since (e.g. by a compaction)
+        """
+        try:
+            with open(self.journal_path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                inode, offset = position
+                if stat.st_ino != inode or stat.st_size < offset:
+                    return None
+                f.seek(offset)
+                data = f.read()
+        except (FileNotFoundError, TypeError, ValueError):
+            return None
+        return _parse_lines(data[:data.rfind(b'\n') + 1], self.journal_path)
+
+    def append(self, record):
+        """Append a change record and flush it to disk. The caller must hold lock()."""
+        data = json_codec.dumps_bytes(record) + b'\n'
+        fd = os.open(self.journal_path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            size = os.fstat(fd).st_size
+            if size and os.pread(fd, 1, size - 1) != b'\n':
+                # Terminate a line left unfinished by a writer that crashed
+                data = b'\n' + data
+            os.write(fd, data)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def compact(self, records):
+        """
+        Write put records, one per product, as the new snapshot and start an empty journal.
+
+        The caller must hold lock() and reopen the journal afterwards.
+        """
+        atomic_write_bytes(self.snapshot_path, b''.join(json_codec.dumps_bytes(r) + b'\n' for r in records))
+        atomic_write_bytes(self.journal_path, b'')
+        logging.info(f"Compacted catalog journal into a snapshot of {len(records)} products")
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,186 @@
+import os
+import re
+import hashlib
+import logging
+
+RESPONSE_DIR = 'response'
+RAW_DIR = 'raw'
+
+# Product IDs are upload timestamps (YYYYMMDDHHMMSS); the date part names the shard
+TIMESTAMP_ID = re.compile(r'^(\d{8})\d{6}')
+
+# Fields of a product record that hold paths of files in raw/
+RAW_PATH_FIELDS = ('images', 'raw_images', 'image_paths')
+
+
+def shard_for(product_id):
+    """
+    Shard directory name for a product ID.
+
+    Timestamp IDs are grouped by day (e.g. 20250318); any other ID goes to one of
+    256 hash buckets (h00-hff) so no single directory grows without bound.
+    """
+    match = TIMESTAMP_ID.match(product_id)
+    if match:
+        return match.group(1)
+    return 'h' + hashlib.md5(product_id.encode('utf-8')).hexdigest()[:2]
+
+
+def raw_shard_for(filename):
+    """Shard for a raw file; raw files are named <product_id>_<name>."""
+    return shard_for(filename.split('_', 1)[0])
+
+
+def product_file_path(product_id, response_dir=RESPONSE_DIR):
+    """Path where a product's JSON file is written: response/<shard>/<product_id>.json."""
+    return os.path.join(response_dir, shard_for(product_id), f"{product_id}.json")
+
+
+def details_file_path(product_id, response_dir=RESPONSE_DIR):
+    """Path of a product's detail fields side record: response/<shard>/<product_id>.details."""
+    return os.path.join(response_dir, shard_for(product_id), f"{product_id}.details")
+
+
+def legacy_product_file_path(product_id, response_dir=RESPONSE_DIR):
+    """Path of a product file in the old flat layout: response/<product_id>.json."""
+    return os.path.join(response_dir, f"{product_id}.json")
+
+
+def find_product_file(product_id, response_dir=RESPONSE_DIR):
+    """Existing JSON file for a product in the sharded or the flat layout, or None."""
+    for path in (product_file_path(product_id, response_dir), legacy_product_file_path(product_id, response_dir)):
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def iter_product_files(response_dir=RESPONSE_DIR):
+    """Yield (product_id, path) for every product JSON file, sharded or flat."""
+    try:
+        entries = list(os.scandir(response_dir))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.name.startswith('.'):
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            try:
+                names = os.listdir(entry.path)
+            except FileNotFoundError:
+                continue
+            for name in names:
+                if name.endswith('.json') and not name.startswith('.'):
+                    yield name[:-len('.json')], os.path.join(entry.path, name)
+        elif entry.name.endswith('.json'):
+            yield entry.name[:-len('.json')], entry.path
+
+
+def raw_file_path(filename, raw_dir=RAW_DIR):
+    """Path where a raw file is written: raw/<shard>/<filename>."""
+    return os.path.join(raw_dir, raw_shard_for(filename), filename)
+
+
+def resolve_raw_file(filename, raw_dir=RAW_DIR):
+    """
+    Existing path of a raw file given its bare file name, or None.
+
+    Looks in the file's shard first and then in the flat legacy layout, so both
+    migrated and unmigrated trees work with a constant number of stat calls.
+    """
+    filename = os.path.basename(filename)
+    for path in (raw_file_path(filename, raw_dir), os.path.join(raw_dir, filename)):
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def find_raw_files(product_id, raw_dir=RAW_DIR):
+    """
+    Sorted paths of the raw files that belong to a product (named <product_id>_*).
+
+    Only the product's shard is listed, so the cost does not depend on the size
+    of the catalog. The flat legacy directory is checked only when the shard has
+    no match.
+    """
+    prefix = f"{product_id}_"
+    for directory in (os.path.join(raw_dir, shard_for(product_id)), raw_dir):
+        try:
+            matches = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                             if name.startswith(prefix))
+        except FileNotFoundError:
+            continue
+        matches = [path for path in matches if os.path.isfile(path)]
+        if matches:
+            return matches
+    return []
+
+
+def migrate_to_sharded_layout(response_dir=RESPONSE_DIR, raw_dir=RAW_DIR):
+    """
+    Move flat raw/ and response/ files into their shard directories.
+
+    Raw paths stored in product records (images, raw_images, image_paths) are
+    rewritten to the new locations. Image URLs keep the /raw/<filename> form,
+    which the /raw route resolves to the shard. Safe to re-run.
+
+    Returns:
+        tuple: (raw files moved, product files moved)
+    """
+    # Imported here to keep this module free of dependencies on the store layer
+    from utils import json_codec
+    from utils.atomic_file import file_lock
+
+    raw_moved = 0
+    for name in sorted(os.listdir(raw_dir)) if os.path.isdir(raw_dir) else []:
+        source = os.path.join(raw_dir, name)
+        if name.startswith('.') or not os.path.isfile(source):
+            continue
+        target = raw_file_path(name, raw_dir)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(source, target)
+        raw_moved += 1
+
+    products_moved = 0
+    for name in sorted(os.listdir(response_dir)) if os.path.isdir(response_dir) else []:
+        source = os.path.join(response_dir, name)
+        if not name.endswith('.json') or name.startswith('.') or not os.path.isfile(source):
+            continue
+        product_id = name[:-len('.json')]
+        target = product_file_path(product_id, response_dir)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            with file_lock(target):
+                product = json_codec.read_file(source)
+                product.update(sharded_raw_fields(product, raw_dir))
+                json_codec.write_file(target, product)
+                os.remove(source)
+            products_moved += 1
+        except Exception as e:
+            logging.error(f"Error migrating {source}: {str(e)}")
+
+    logging.info(f"Moved {raw_moved} raw files and {products_moved} product files into shards")
+    return raw_moved, products_moved
+
+
+def sharded_raw_fields(product, raw_dir=RAW_DIR):
+    """
+    Raw path fields of a product rewritten to the files' shard locations.
+
+    Returns:
+        dict: Only the fields whose value changes
+    """
+    changes = {}
+    for field in RAW_PATH_FIELDS:
+        if isinstance(product.get(field), list):
+            paths = [_sharded_raw_path(path, raw_dir) for path in product[field]]
+            if paths != product[field]:
+                changes[field] = paths
+    return changes
+
+
+def _sharded_raw_path(path, raw_dir):
+    """Rewrite a stored raw/<filename> path to its shard if the file lives there."""
+    if not isinstance(path, str):
+        return path
+    resolved = resolve_raw_file(path, raw_dir)
+    return resolved if resolved else path
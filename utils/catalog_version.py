@@ -0,0 +1,81 @@
+import os
+import uuid
+import logging
+import threading
+
+from utils import json_codec
+from utils.atomic_file import atomic_write_bytes
+
+VERSION_FILE = '_version'
+
+
+class CatalogVersion:
+    """
+    Catalog version kept in a small file (response/_version):
+
+        {"epoch": <random hex>, "version": <counter>}
+
+    Writers increase the counter after every change that can alter a rendered
+    page, and caches of values computed from the catalog (filter results,
+    spotlight results, ETags) are keyed on the version. It lives apart from the
+    listing index so a write that leaves every listing field unchanged can
+    increase it without rewriting the index. Readers re-read the file only when
+    its inode, mtime or size changed.
+
+    When the file is missing or unreadable the counter starts again at 0 under
+    a new random epoch, so a version is never handed out twice and a cached
+    value or ETag from before can't be taken as current.
+    """
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, VERSION_FILE)
+        self._lock = threading.Lock()
+        self._signature = None
+        self._value = None
+
+    def _stat_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def read(self):
+        """
+        Current version.
+
+        Returns:
+            str: "<epoch>-<counter>"; only meaningful compared for equality
+        """
+        signature = self._stat_signature()
+        with self._lock:
+            if self._value is None or signature != self._signature:
+                data = None
+                if signature is not None:
+                    try:
+                        data = json_codec.read_file(self.path)
+                    except FileNotFoundError:
+                        pass
+                    except Exception as e:
+                        logging.error(f"Error reading catalog version {self.path}: {str(e)}")
+                if not data or not data.get('epoch'):
+                    data = self._write({'epoch': uuid.uuid4().hex, 'version': 0})
+                    logging.info(f"Started catalog version epoch {data['epoch']} in {self.path}")
+                    signature = self._signature
+                self._value = (data['epoch'], data.get('version') or 0)
+                self._signature = signature
+            return f"{self._value[0]}-{self._value[1]}"
+
+    def _write(self, data):
+        atomic_write_bytes(self.path, json_codec.dumps_bytes(data))
+        self._signature = self._stat_signature()
+        return data
+
+    def bump(self):
+        """Increase the version. The caller holds the catalog's write lock."""
+        self.read()
+        with self._lock:
+            epoch, counter = self._value
+            self._write({'epoch': epoch, 'version': counter + 1})
+            self._value = (epoch, counter + 1)
+        return f"{epoch}-{counter + 1}"
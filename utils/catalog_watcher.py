@@ -0,0 +1,200 @@
+import os
+import time
+import errno
+import struct
+import ctypes
+import ctypes.util
+import logging
+import sys
+
+# inotify event flags (see inotify(7))
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE |
+              IN_DELETE_SELF | IN_MOVE_SELF)
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def _subdirectories(directory):
+    """Shard subdirectories of directory, skipping hidden ones such as .locks."""
+    try:
+        with os.scandir(directory) as entries:
+            return [entry.path for entry in entries
+                    if entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.')]
+    except FileNotFoundError:
+        return []
+
+
+class InotifyWatcher:
+    """
+    Report files added, modified or deleted in a directory and its immediate
+    subdirectories (the response/ shards) using Linux inotify.
+
+    Events are read from a non-blocking inotify descriptor, so poll() costs a
+    single read() syscall when nothing has changed.
+    """
+
+    def __init__(self, directory, suffix='.json'):
+        self.directory = directory
+        self.suffix = suffix
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self._root_wd = None
+        try:
+            self._root_wd = self._add_watch(directory)
+            for subdirectory in _subdirectories(directory):
+                self._add_watch(subdirectory)
+        except Exception:
+            self.close()
+            raise
+
+    def _add_watch(self, path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        return wd
+
+    def _keys_in(self, path):
+        try:
+            return {name[:-len(self.suffix)] for name in os.listdir(path) if name.endswith(self.suffix)}
+        except FileNotFoundError:
+            return set()
+
+    def poll(self):
+        """
+        Collect the changes since the previous call.
+
+        Returns:
+            tuple or None: (changed, deleted) sets of file names without the suffix,
+                or None if events were lost and the caller must rescan everything
+        """
+        changed = set()
+        deleted = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = data[offset:offset + length].rstrip(b'\0').decode('utf-8', 'replace')
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    # Events were dropped
+                    return None
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                    if wd == self._root_wd:
+                        # The watched directory itself went away
+                        return None
+                    # A shard directory was removed; its files were reported as deleted
+                    continue
+                if mask & IN_ISDIR:
+                    if wd == self._root_wd and mask & (IN_CREATE | IN_MOVED_TO) and not name.startswith('.'):
+                        # New shard: watch it first, then report what is already in it
+                        path = os.path.join(self.directory, name)
+                        try:
+                            self._add_watch(path)
+                        except OSError as e:
+                            logging.warning(f"Could not watch new shard {path}: {str(e)}")
+                            return None
+                        changed |= self._keys_in(path)
+                    continue
+                if not name.endswith(self.suffix):
+                    continue
+                key = name[:-len(self.suffix)]
+                if mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                    changed.add(key)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    deleted.add(key)
+        return changed, deleted
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class PollingWatcher:
+    """
+    Report files added, modified or deleted in a directory and its immediate
+    subdirectories by comparing scandir() snapshots of (mtime, size). Used where
+    inotify is not available.
+
+    Scans are throttled to at most one every min_interval seconds.
+    """
+
+    def __init__(self, directory, suffix='.json', min_interval=2.0):
+        self.directory = directory
+        self.suffix = suffix
+        self.min_interval = min_interval
+        self._last_scan = 0.0
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for path in [self.directory] + _subdirectories(self.directory):
+            try:
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if not entry.name.endswith(self.suffix):
+                            continue
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        snapshot[(path, entry.name[:-len(self.suffix)])] = (stat.st_mtime_ns, stat.st_size)
+            except FileNotFoundError:
+                continue
+        self._last_scan = time.monotonic()
+        return snapshot
+
+    def poll(self):
+        """
+        Collect the changes since the previous scan.
+
+        Returns:
+            tuple: (changed, deleted) sets of file names without the suffix
+        """
+        if time.monotonic() - self._last_scan < self.min_interval:
+            return set(), set()
+        previous = self._snapshot
+        current = self._scan()
+        self._snapshot = current
+        changed = {key for (path, key), signature in current.items() if previous.get((path, key)) != signature}
+        deleted = {key for (path, key) in previous if (path, key) not in current}
+        return changed, deleted
+
+    def close(self):
+        pass
+
+
+def create_watcher(directory, suffix='.json'):
+    """
+    Create the best available change detector for a directory and its shard
+    subdirectories: inotify on Linux, otherwise (or if inotify cannot be set up)
+    an mtime polling watcher.
+    """
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(directory, suffix=suffix)
+        except Exception as e:
+            logging.warning(f"inotify unavailable for {directory}, falling back to polling: {str(e)}")
+    return PollingWatcher(directory, suffix=suffix)
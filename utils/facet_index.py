@@ -0,0 +1,208 @@
+import logging
+import itertools
+
+# Facet name -> ProductSummary attribute holding the product's values for it.
+# "keyword" indexes the lower-cased tags, specifications and SEO keywords, so
+# filter values that aren't in the facet keyword lists can still be answered.
+FACET_ATTRIBUTES = {
+    'category': 'category',
+    'color': 'colors',
+    'material': 'materials',
+    'style': 'styles',
+    'audience': 'audiences',
+    'keyword': 'keywords',
+}
+
+
+# Distinguishes FacetIndex instances, whose bitsets are only valid with the ordinals they were made from
+_generations = itertools.count(1)
+
+
+def _facet_values(summary):
+    """(facet, value) pairs of a product summary."""
+    for facet, attribute in FACET_ATTRIBUTES.items():
+        values = getattr(summary, attribute)
+        if isinstance(values, str):
+            values = (values,)
+        for value in values:
+            if value:
+                yield facet, value
+
+
+def _bitset(ordinals, size):
+    """Python int with the bits of ordinals set, built in one pass instead of one shift per ordinal."""
+    bitmap = bytearray((size + 7) // 8)
+    for ordinal in ordinals:
+        bitmap[ordinal >> 3] |= 1 << (ordinal & 7)
+    return int.from_bytes(bitmap, 'little')
+
+
+class FacetIndex:
+    """
+    Inverted index from facet values to the products that have them.
+
+    Built from the ProductSummary records, whose facet values are extracted when
+    a product is written. Every product gets a dense ordinal, and each facet value
+    maps to a bitset of ordinals stored as a Python int, so combining filters is
+    a chain of `&` over machine words and counting the matches is a popcount.
+    Treat an instance as immutable; when the catalog changes, build a new one or
+    derive one with updated(), which only touches the changed products' bits.
+    Each instance gets its own generation number, so values derived from its
+    bitsets can be cached per instance.
+    """
+
+    def __init__(self, summaries):
+        self.generation = next(_generations)
+        # Summary indexed under each ordinal, so updated() can clear its bits
+        self._summaries = []
+        ordinals = {facet: {} for facet in FACET_ATTRIBUTES}
+        for ordinal, summary in enumerate(summaries):
+            self._summaries.append(summary)
+            for facet, value in _facet_values(summary):
+                ordinals[facet].setdefault(value, []).append(ordinal)
+        size = len(self._summaries)
+        self._ordinals = {summary.product_id: ordinal for ordinal, summary in enumerate(self._summaries)}
+        self._postings = {facet: {value: _bitset(members, size) for value, members in postings.items()}
+                          for facet, postings in ordinals.items()}
+        # Ordinals of removed products, given to the next products added by updated()
+        self._free = []
+        # Bitset of every product, the selection when no filter is active
+        self.all = (1 << size) - 1
+
+    def __len__(self):
+        return len(self._ordinals)
+
+    def updated(self, removed, added):
+        """
+        A copy of the index with some products removed and others added.
+
+        A changed product can be passed in both, and keeps its ordinal either
+        way. Ordinals of products removed for good are reused by new ones, so
+        the bitsets don't grow with every replacement.
+
+        Args:
+            removed (iterable): IDs of the products to drop; unknown IDs are ignored
+            added (iterable): Summaries of the products to index
+
+        Returns:
+            FacetIndex: New index, with its own generation
+        """
+        index = FacetIndex.__new__(FacetIndex)
+        index.generation = next(_generations)
+        index._summaries = list(self._summaries)
+        index._ordinals = dict(self._ordinals)
+        index._free = list(self._free)
+        index.all = self.all
+        # Only the facets' value dicts are copied; the bitsets are immutable ints
+        postings = index._postings = {facet: dict(values) for facet, values in self._postings.items()}
+        added = list(added)
+        kept = {summary.product_id for summary in added}
+        for product_id in removed:
+            # Products added again keep their ordinal and are replaced below
+            ordinal = None if product_id in kept else index._ordinals.pop(product_id, None)
+            if ordinal is not None:
+                index._clear(ordinal)
+                index._free.append(ordinal)
+                index.all &= ~(1 << ordinal)
+        for summary in added:
+            ordinal = index._ordinals.get(summary.product_id)
+            if ordinal is not None:
+                index._clear(ordinal)
+            elif index._free:
+                ordinal = index._free.pop()
+            else:
+                ordinal = len(index._summaries)
+                index._summaries.append(None)
+            index._ordinals[summary.product_id] = ordinal
+            index._summaries[ordinal] = summary
+            index.all |= 1 << ordinal
+            for facet, value in _facet_values(summary):
+                postings[facet][value] = postings[facet].get(value, 0) | (1 << ordinal)
+        return index
+
+    def _clear(self, ordinal):
+        """Clear the bits of the product under an ordinal, while updated() builds this index."""
+        mask = ~(1 << ordinal)
+        postings = self._postings
+        for facet, value in _facet_values(self._summaries[ordinal]):
+            # A value can repeat within a product, e.g. a tag that is also an SEO keyword
+            bits = postings[facet].get(value, 0) & mask
+            if bits:
+                postings[facet][value] = bits
+            else:
+                postings[facet].pop(value, None)
+        self._summaries[ordinal] = None
+
+    def values(self, facet):
+        """Sorted distinct values of a facet, e.g. every color in the catalog."""
+        return sorted(self._postings[facet])
+
+    def bits(self, facet, value):
+        """Bitset of the products with exactly this facet value."""
+        return self._postings[facet].get(value, 0)
+
+    def match(self, facet, text):
+        """
+        Bitset of the products a catalog filter value selects.
+
+        Same semantics as the catalog's original per-product checks, evaluated per
+        distinct value instead of per product:
+        - category: exact match
+        - color, material, style: some keyword of the product contains text
+          (case-insensitive); a value from the facet's keyword list is a direct lookup
+        - audience: some target audience contains text (case-insensitive)
+
+        Returns:
+            int: Bitset of product ordinals
+        """
+        if facet == 'category':
+            return self.bits('category', text)
+        needle = text.lower()
+        if facet in ('color', 'material', 'style'):
+            direct = self._postings[facet].get(text.title())
+            if direct is not None:
+                return direct
+            facet = 'keyword'
+        elif facet != 'audience':
+            logging.warning(f"Unknown facet for filtering: {facet}")
+            return 0
+        matches = 0
+        for value, bits in self._postings[facet].items():
+            if needle in value.lower():
+                matches |= bits
+        return matches
+
+    def counts(self, facet, within=None):
+        """
+        Number of products with each value of a facet.
+
+        Args:
+            facet (str): Facet name
+            within (int, optional): Only count products in this bitset, e.g. the
+                products selected by the other active filters
+
+        Returns:
+            dict: {value: count}
+        """
+        postings = self._postings[facet]
+        if within is None:
+            return {value: bits.bit_count() for value, bits in postings.items()}
+        return {value: (bits & within).bit_count() for value, bits in postings.items()}
+
+    def from_ids(self, product_ids):
+        """Bitset of the given product IDs; IDs not in the index are ignored."""
+        ordinals = self._ordinals
+        return _bitset((ordinals[product_id] for product_id in product_ids if product_id in ordinals),
+                       len(self._summaries))
+
+    def to_ids(self, bits):
+        """Set of the product IDs in a bitset."""
+        summaries = self._summaries
+        # Scan the binary digits lowest ordinal first; find() skips runs of zeros in C
+        digits = bin(bits)[:1:-1]
+        found = set()
+        ordinal = digits.find('1')
+        while ordinal != -1:
+            found.add(summaries[ordinal].product_id)
+            ordinal = digits.find('1', ordinal + 1)
+        return found
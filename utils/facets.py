@@ -0,0 +1,115 @@
+import os
+import re
+import sys
+import json
+import hashlib
+import logging
+
+# Keywords matched against a product's lower-cased tags, specifications and SEO
+# keywords to build the catalog's color, material and style filters. They are
+# read from a JSON file mapping each facet to its keywords; set
+# FACET_TAXONOMY_PATH to use a different file.
+DEFAULT_TAXONOMY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'facet_taxonomy.json')
+
+# Joins a product's keywords into one text; it can't occur in a keyword, so no
+# match spans two of them
+SEPARATOR = '\x00'
+
+
+def load_taxonomy(path=None):
+    """
+    Read the facet taxonomy.
+
+    Args:
+        path (str, optional): JSON file of {facet: [keyword, ...]}; defaults to
+            FACET_TAXONOMY_PATH or utils/facet_taxonomy.json
+
+    Returns:
+        dict: Lower-cased keywords of each facet, in file order
+    """
+    path = path or os.environ.get('FACET_TAXONOMY_PATH') or DEFAULT_TAXONOMY_PATH
+    with open(path, 'r', encoding='utf-8') as f:
+        taxonomy = json.load(f)
+    return {facet: [str(keyword).lower() for keyword in keywords if keyword]
+            for facet, keywords in taxonomy.items()}
+
+
+def _trie_pattern(words):
+    """
+    Regex matching any of words, structured as a trie so each position of the
+    text is tried against the keywords' shared prefixes once, not word by word.
+    Longer words are preferred over their prefixes.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A word ends here, so the longer continuations are optional
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+
+class FacetMatcher:
+    """
+    Finds every facet keyword that occurs in a product's keywords with a single
+    scan of their concatenated text.
+
+    All facets share one compiled regex. Matching uses a lookahead, so a match is
+    found at every position of the text, and each match also implies the taxonomy
+    keywords it contains (e.g. "golden" contains "gold"). The result is the same as
+    testing every keyword against every product keyword with `in`, but the cost
+    grows with the length of the text rather than with the size of the taxonomy.
+    """
+
+    def __init__(self, taxonomy):
+        self.taxonomy = taxonomy
+        self.fingerprint = hashlib.md5(json.dumps(taxonomy, sort_keys=True).encode('utf-8')).hexdigest()
+
+        owners = {}
+        for facet, keywords in taxonomy.items():
+            for position, keyword in enumerate(keywords):
+                owners.setdefault(keyword, []).append((facet, position, sys.intern(keyword.title())))
+        # Facet hits implied by a match: the keyword itself and every keyword inside it
+        self._hits = {keyword: [hit for other in owners if other in keyword for hit in owners[other]]
+                      for keyword in owners}
+        self._pattern = re.compile(f'(?=({_trie_pattern(owners)}))') if owners else None
+
+    def match(self, keywords):
+        """
+        Facet values of a product.
+
+        Args:
+            keywords (tuple): The product's lower-cased keywords
+
+        Returns:
+            dict: Title-cased values per facet, e.g. {'color': ('Red',), ...}, in
+                taxonomy order; every facet of the taxonomy is present
+        """
+        hits = {facet: {} for facet in self.taxonomy}
+        if self._pattern is not None and keywords:
+            found = {match.group(1) for match in self._pattern.finditer(SEPARATOR.join(keywords))}
+            for keyword in found:
+                for facet, position, value in self._hits[keyword]:
+                    hits[facet][position] = value
+        return {facet: tuple(values[position] for position in sorted(values)) for facet, values in hits.items()}
+
+
+def _load_matcher():
+    try:
+        return FacetMatcher(load_taxonomy())
+    except Exception as e:
+        logging.error(f"Error loading the facet taxonomy, facet filters will be empty: {str(e)}")
+        return FacetMatcher({})
+
+
+# Shared matcher used when product summaries are built
+facet_matcher = _load_matcher()
@@ -0,0 +1,52 @@
+import json
+
+from utils.atomic_file import atomic_write_bytes
+
+# JSON codec for product records: orjson when it is installed, the standard
+# library json module otherwise. Output is compact by default; pass pretty=True
+# for indented output meant for people (e.g. downloads).
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def loads(data):
+    """Parse JSON from str or bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj, pretty=False):
+    """Serialize obj to a JSON string, compact unless pretty is True."""
+    return dumps_bytes(obj, pretty=pretty).decode('utf-8')
+
+
+def dumps_bytes(obj, pretty=False):
+    """Serialize obj to UTF-8 encoded JSON, compact unless pretty is True."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option)
+    if pretty:
+        return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def read_file(path):
+    """Read and parse a JSON file."""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def write_file(path, obj, pretty=False):
+    """
+    Serialize obj and atomically replace path with it, compact unless pretty is True.
+
+    Readers of path never see a partially written file.
+    """
+    atomic_write_bytes(path, dumps_bytes(obj, pretty=pretty))
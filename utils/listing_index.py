@@ -0,0 +1,222 @@
+import os
+import logging
+import threading
+
+from utils import json_codec
+from utils.atomic_file import atomic_write_bytes
+from utils.product_summary import ProductSummary
+from utils.facet_index import FacetIndex
+from utils.facets import facet_matcher
+from utils.pagination import SortedListing
+from utils.search_index import SearchIndex
+
+INDEX_FILE = '_index'
+
+
+class ListingIndex:
+    """
+    Sidecar file (response/_index) holding the ProductSummary of every product:
+    the fields the catalog and search pages render, plus precomputed facet keys.
+
+    The file is compact JSON:
+
+        {"fields": [<ProductSummary.__slots__>],
+         "taxonomy": <facet taxonomy fingerprint>,
+         "journal": [<inode>, <size>],
+         "products": [[<field values>], ...]}
+
+    An index written with other fields or another facet taxonomy is treated as
+    missing, so it gets rebuilt. "journal" is the position of the catalog journal the index was written at,
+    so a stale index (e.g. after a crash between the two writes) can be detected
+    when the catalog is loaded.
+
+    The file is replaced atomically whenever a write changes a summary; writes
+    that leave every summary as it was only confirm() the index in memory.
+    Readers re-parse it only when its inode, mtime or size changed. The
+    FacetIndex, the SortedListing orders and the SearchIndex over it are built
+    on first use and then updated for the products whose summaries differ,
+    both after a write() and after re-reading a file another process wrote.
+    """
+
+    def __init__(self, directory):
+        self.path = os.path.join(directory, INDEX_FILE)
+        self._lock = threading.Lock()
+        self._signature = None
+        self._summaries = None
+        self._journal_position = None
+        self._facets = None
+        self._orders = (None, {})
+        self._search = (None, None)
+
+    def _stat_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def read(self):
+        """
+        Summaries in the index, keyed by product ID.
+
+        Returns:
+            dict or None: Shared, read-only mapping, or None if the index is
+                missing, unreadable or was written by an incompatible version
+        """
+        signature = self._stat_signature()
+        if signature is None:
+            return None
+        with self._lock:
+            if signature != self._signature:
+                try:
+                    data = json_codec.read_file(self.path)
+                    if data.get('fields') != list(ProductSummary.__slots__):
+                        logging.warning(f"Listing index {self.path} has an outdated format")
+                        return None
+                    if data.get('taxonomy') != facet_matcher.fingerprint:
+                        logging.warning(f"Listing index {self.path} was built with another facet taxonomy")
+                        return None
+                    summaries, changed = self._parse(data['products'])
+                except FileNotFoundError:
+                    return None
+                except Exception as e:
+                    logging.error(f"Error reading listing index {self.path}: {str(e)}")
+                    return None
+                previous = self._summaries
+                self._summaries = summaries
+                self._journal_position = tuple(data.get('journal') or ())
+                self._signature = signature
+                if previous is not None:
+                    self._carry_over(previous, summaries, changed)
+            return self._summaries
+
+    def _parse(self, entries):
+        """
+        Summaries of the index file's entries, and the IDs of the products whose
+        summaries differ from the ones read or written before. Unchanged
+        summaries are reused. The caller holds the lock.
+        """
+        previous = self._summaries or {}
+        summaries = {}
+        changed = []
+        for entry in entries:
+            summary = ProductSummary.from_index(entry)
+            indexed = previous.get(summary.product_id)
+            if indexed is not None and indexed.to_index() == summary.to_index():
+                summary = indexed
+            else:
+                changed.append(summary.product_id)
+            summaries[summary.product_id] = summary
+        changed.extend(product_id for product_id in previous if product_id not in summaries)
+        return summaries, changed
+
+    def _carry_over(self, previous, summaries, changed):
+        """
+        Update the structures built over the previous summaries for the products
+        in changed, so they describe summaries. The caller holds the lock.
+        """
+        added = [summaries[product_id] for product_id in changed if product_id in summaries]
+        facets_of, facets = self._facets or (None, None)
+        if facets_of is previous:
+            self._facets = (summaries, facets.updated(changed, added) if changed else facets)
+        orders_of, orders = self._orders
+        if orders_of is previous:
+            self._orders = (summaries, {sort: order.updated(changed, added) for sort, order in orders.items()})
+        search_of, search = self._search
+        if search_of is previous:
+            for product_id in changed:
+                if product_id in summaries:
+                    search.add(summaries[product_id])
+                else:
+                    search.remove(product_id)
+            self._search = (summaries, search)
+
+    def facets(self, summaries):
+        """
+        FacetIndex over summaries, as returned by read().
+
+        Cached like the sort orders; read() and write() derive a new one with
+        FacetIndex.updated() for the products that changed.
+        """
+        with self._lock:
+            if self._facets is None or self._facets[0] is not summaries:
+                self._facets = (summaries, FacetIndex(summaries.values()))
+            return self._facets[1]
+
+    def ordered(self, summaries, sort):
+        """
+        SortedListing of summaries, as returned by read(), in one sort order.
+
+        Each order is cached until read() or write() produce a new summaries
+        mapping, and carried over to it for the products that changed.
+        """
+        with self._lock:
+            if self._orders[0] is not summaries:
+                self._orders = (summaries, {})
+            orders = self._orders[1]
+            if sort not in orders:
+                orders[sort] = SortedListing(summaries.values(), sort)
+            return orders[sort]
+
+    def search_index(self, summaries):
+        """
+        SearchIndex over summaries, as returned by read().
+
+        Cached like the sort orders; read() and write() update it in place
+        for the products that changed.
+        """
+        with self._lock:
+            if self._search[0] is not summaries:
+                self._search = (summaries, SearchIndex(summaries.values()))
+            return self._search[1]
+
+    def journal_position(self):
+        """
+        Journal position the summaries are known to match: the one recorded in
+        the index, or a later one passed to confirm(). None if there is no
+        usable index.
+        """
+        if self.read() is None:
+            return None
+        return self._journal_position
+
+    def confirm(self, journal_position):
+        """
+        Record that the summaries last read or written still match the catalog
+        at a later journal position, without rewriting the file.
+
+        Only this process learns the new position; others find the writes
+        since the recorded one in the journal and check them again.
+        """
+        with self._lock:
+            self._journal_position = tuple(journal_position)
+
+    def write(self, summaries, journal_position=None, changed=None):
+        """
+        Atomically replace the index.
+
+        Args:
+            summaries (dict): ProductSummary records keyed by product ID
+            journal_position (tuple, optional): Position of the catalog journal
+                the summaries reflect
+            changed (iterable, optional): IDs of the products that differ from
+                the summaries last read or written; the cached facet index,
+                sort orders and search index are then updated instead of
+                being rebuilt
+        """
+        previous = self.read()
+        data = json_codec.dumps_bytes({
+            'fields': list(ProductSummary.__slots__),
+            'taxonomy': facet_matcher.fingerprint,
+            'journal': list(journal_position) if journal_position else None,
+            'products': [summary.to_index() for summary in summaries.values()],
+        })
+        atomic_write_bytes(self.path, data)
+        with self._lock:
+            # Keep the written summaries instead of parsing the file back
+            self._summaries = summaries
+            self._journal_position = tuple(journal_position) if journal_position else ()
+            self._signature = self._stat_signature()
+            if changed is None or previous is None:
+                return
+            self._carry_over(previous, summaries, list(changed))
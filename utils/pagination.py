@@ -0,0 +1,205 @@
+import sys
+import base64
+import binascii
+from bisect import bisect_left, bisect_right, insort
+
+from utils import json_codec
+
+DEFAULT_PER_PAGE = 24
+MAX_PER_PAGE = 100
+
+# Sort key of products without a parseable price, which are listed after the
+# priced ones in both price orders
+NO_PRICE = sys.float_info.max
+
+# Sort keys for ProductSummary listings: (key function, reverse). Ties are
+# broken by product ID, so every listing has one well-defined order to page through.
+SORT_KEYS = {
+    'newest': (lambda s: s.product_id, True),
+    'name_asc': (lambda s: s.product_name.lower(), False),
+    'name_desc': (lambda s: s.product_name.lower(), True),
+    'price_asc': (lambda s: NO_PRICE if s.price_value is None else s.price_value, False),
+    'price_desc': (lambda s: NO_PRICE if s.price_value is None else -s.price_value, False),
+}
+
+# Sort orders whose keys are numbers rather than strings
+NUMERIC_SORTS = ('price_asc', 'price_desc')
+
+
+def sort_position(summary, sort):
+    """(sort key, product ID) of a summary, the value a cursor points at."""
+    key, _ = SORT_KEYS.get(sort, SORT_KEYS['newest'])
+    return (key(summary), summary.product_id)
+
+
+def clamp_per_page(per_page):
+    """Page size to use for a requested per_page value, which may be None."""
+    if not per_page or per_page < 1:
+        return DEFAULT_PER_PAGE
+    return min(per_page, MAX_PER_PAGE)
+
+
+def encode_cursor(summary, sort):
+    """
+    Opaque cursor pointing just after summary in a listing sorted by sort.
+
+    Returns:
+        str: URL-safe token to pass back as the cursor parameter
+    """
+    sort_key, product_id = sort_position(summary, sort)
+    data = json_codec.dumps_bytes({'sort': sort, 'key': sort_key, 'id': product_id})
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """
+    Position a cursor from encode_cursor() points at.
+
+    Args:
+        cursor (str): Token from encode_cursor()
+        sort (str): Sort order of the listing being paged
+
+    Returns:
+        tuple: (sort key, product ID)
+
+    Raises:
+        ValueError: If the cursor is malformed or was issued for another sort order
+    """
+    try:
+        data = json_codec.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        position = (data['key'], data['id'])
+        issued_for = data['sort']
+    except (binascii.Error, ValueError, TypeError, KeyError) as e:
+        raise ValueError(f"Invalid cursor: {str(e)}")
+    if issued_for != sort:
+        raise ValueError(f"Cursor was issued for sort order {issued_for!r}, not {sort!r}")
+    key_types = (int, float) if sort in NUMERIC_SORTS else (str,)
+    if not isinstance(position[0], key_types) or isinstance(position[0], bool) or not isinstance(position[1], str):
+        raise ValueError("Invalid cursor position")
+    return position
+
+
+class SortedListing:
+    """
+    Summaries of a catalog in one sort order, for paging through them.
+
+    The order is computed once per listing index, so a page is a slice of it (or
+    a binary search to a cursor's position) instead of a sort of the whole
+    catalog, and only the summaries on the page are collected. When products
+    are written, updated() derives the new order with insort instead of sorting
+    again. Treat an instance as immutable.
+    """
+
+    def __init__(self, summaries, sort):
+        self.sort = sort
+        self._key, self.reverse = SORT_KEYS.get(sort, SORT_KEYS['newest'])
+        # Kept in ascending order; reverse orders are read back to front
+        entries = sorted(((self._key(s), s.product_id), s) for s in summaries)
+        self._keys = [entry[0] for entry in entries]
+        self._summaries = [entry[1] for entry in entries]
+        self._positions = {summary.product_id: key for key, summary in entries}
+
+    def __len__(self):
+        return len(self._summaries)
+
+    def updated(self, removed, added):
+        """
+        A copy of the listing with some products replaced.
+
+        Args:
+            removed (list): Product IDs to take out (e.g. the old versions of
+                changed products)
+            added (list): ProductSummary records to insert
+
+        Returns:
+            SortedListing: The new listing; this one is left unchanged
+        """
+        listing = object.__new__(SortedListing)
+        listing.sort, listing._key, listing.reverse = self.sort, self._key, self.reverse
+        listing._keys = list(self._keys)
+        listing._summaries = list(self._summaries)
+        listing._positions = dict(self._positions)
+        for product_id in removed:
+            key = listing._positions.pop(product_id, None)
+            if key is not None:
+                rank = bisect_left(listing._keys, key)
+                del listing._keys[rank]
+                del listing._summaries[rank]
+        for summary in added:
+            key = (self._key(summary), summary.product_id)
+            insort(listing._keys, key)
+            listing._summaries.insert(bisect_left(listing._keys, key), summary)
+            listing._positions[summary.product_id] = key
+        return listing
+
+    def between(self, low=None, high=None):
+        """
+        Summaries whose sort key lies in [low, high], found by two binary searches.
+
+        Only meaningful for orders keyed on a number, e.g. 'price_asc' for a price
+        range. Products keyed NO_PRICE are never included.
+
+        Args:
+            low (float, optional): Smallest key to include; unbounded if None
+            high (float, optional): Largest key to include; unbounded if None
+
+        Returns:
+            list: ProductSummary records in ascending key order
+        """
+        start = 0 if low is None else bisect_left(self._keys, (low,))
+        # (high, <any product ID>) sorts before (high, chr(0x10FFFF)) but after (high,)
+        end = bisect_left(self._keys, (NO_PRICE,)) if high is None else bisect_right(self._keys, (high, chr(0x10FFFF)))
+        return self._summaries[start:end]
+
+    def page(self, ids=None, offset=0, limit=None, after=None):
+        """
+        One page of the listing.
+
+        Args:
+            ids (set, optional): Only include these product IDs
+            offset (int): Number of matching products to skip
+            limit (int, optional): Maximum number of products to return
+            after (tuple, optional): (sort key, product ID) from decode_cursor();
+                the page starts right after that position
+
+        Returns:
+            list: ProductSummary records
+        """
+        # Listing ranks the page can start from, in listing order
+        if after is None:
+            low, high = 0, len(self._keys)
+        elif self.reverse:
+            low, high = 0, bisect_left(self._keys, tuple(after))
+        else:
+            low, high = bisect_right(self._keys, tuple(after)), len(self._keys)
+
+        if ids is None:
+            ranks = range(low, high)
+        elif len(ids) * 8 < high - low:
+            # A selective filter: order its IDs instead of walking the listing
+            keys = sorted(key for key in (self._positions.get(product_id) for product_id in ids)
+                          if key is not None)
+            ranks = [rank for rank in (bisect_left(self._keys, key) for key in keys) if low <= rank < high]
+        else:
+            ranks = None
+
+        if ranks is not None:
+            if self.reverse:
+                ranks = ranks[::-1]
+            end = None if limit is None else offset + limit
+            return [self._summaries[rank] for rank in ranks[offset:end]]
+
+        # A broad filter: walk the listing, skipping products it excludes
+        walk = range(high - 1, low - 1, -1) if self.reverse else range(low, high)
+        page = []
+        for rank in walk:
+            summary = self._summaries[rank]
+            if summary.product_id not in ids:
+                continue
+            if offset:
+                offset -= 1
+                continue
+            page.append(summary)
+            if limit is not None and len(page) >= limit:
+                break
+        return page
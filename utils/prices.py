@@ -0,0 +1,31 @@
+import re
+
+# First number in a price, with any thousands or decimal separators
+_NUMBER = re.compile(r'\d[\d.,]*')
+
+
+def parse_price(price):
+    """
+    Numeric value of a free-text price such as "$49.99", "49,99 EUR" or "1,299.00".
+
+    The last "." or "," followed by one or two digits is taken as the decimal
+    separator; any other separators group thousands.
+
+    Args:
+        price: Price as stored in a product record (usually a string)
+
+    Returns:
+        float or None: The price, or None if it contains no number
+    """
+    if isinstance(price, (int, float)) and not isinstance(price, bool):
+        return float(price)
+    match = _NUMBER.search(str(price or ''))
+    if not match:
+        return None
+    number = match.group(0).rstrip('.,')
+    separator = max(number.rfind('.'), number.rfind(','))
+    if separator != -1 and len(number) - separator - 1 in (1, 2):
+        whole, fraction = number[:separator], number[separator + 1:]
+    else:
+        whole, fraction = number, '0'
+    return float(f"{re.sub('[.,]', '', whole)}.{fraction}")
@@ -0,0 +1,17 @@
+# Large product fields that the listing pages and the similarity scan don't
+# need. The product stores keep them apart from the rest of the record and read
+# them only when a single product is fetched with get().
+DETAIL_FIELDS = ('detailed_description', 'persona_descriptions', 'image_features',
+                 'specifications', 'seo_keywords')
+
+
+def split_details(product):
+    """
+    Split a product record into its core fields and its detail fields.
+
+    Returns:
+        tuple: (core, details) dicts; together they hold every field of product
+    """
+    core = {key: value for key, value in product.items() if key not in DETAIL_FIELDS}
+    details = {key: product[key] for key in DETAIL_FIELDS if key in product}
+    return core, details
@@ -0,0 +1,752 @@
+import os
+import copy
+import logging
+import threading
+from contextlib import contextmanager
+
+from utils import json_codec
+from utils import catalog_paths
+from utils.catalog_journal import CatalogJournal
+from utils.catalog_version import CatalogVersion
+from utils.catalog_watcher import create_watcher
+from utils.listing_index import ListingIndex
+from utils.pagination import SORT_KEYS
+from utils.product_details import DETAIL_FIELDS, split_details
+from utils.product_summary import ProductSummary
+from utils.search_text import SEARCH_TEXT_FIELDS, normalize_text, product_search_text, without_search_text
+
+
+class ProductStore:
+    """
+    In-memory catalog of product records backed by the response directory.
+
+    The catalog's source of truth is an append-only journal of changes and the
+    snapshot it is periodically compacted into (see CatalogJournal), so a cold
+    start is one sequential read of the snapshot plus the journal tail instead
+    of parsing a file per product. Every write is appended to the journal, and
+    other worker processes pick it up by reading only the new journal bytes.
+
+    response/<shard>/<product_id>.json files are still written after every
+    change, as a derived per-product export. A tree without a journal (e.g. one
+    created before it existed) is imported from those files on first use, and
+    export files added, edited or removed by hand are picked up by a directory
+    change detector and journaled like any other write.
+
+    The large detail fields (see DETAIL_FIELDS) are not part of the journal: each
+    product's detail fields live in a side record, response/<shard>/<id>.details,
+    that only get() reads. The records kept in memory hold the remaining fields.
+    Each product's search text, which covers detail fields too, is computed
+    when the product is written and journaled beside its record, never in it,
+    so match_text() reads no side records.
+
+    Listing pages (list_summaries() and page_summaries()) read the compact
+    ProductSummary records from the listing index file (response/_index), which
+    is rewritten by every write that changes a product's summary. A process
+    that only serves listings never loads the full records. The catalog
+    version (see CatalogVersion) is increased by every write except
+    update(cache_only=True).
+    """
+
+    def __init__(self, directory='response', compact_every=1000):
+        self.directory = directory
+        # Fold the journal into a new snapshot once it holds this many records
+        self.compact_every = compact_every
+        self._products = {}
+        # Product ID -> normalized search text of the product, details included
+        self._search_texts = {}
+        self._lock = threading.RLock()
+        self._journal = CatalogJournal(directory)
+        self._index = ListingIndex(directory)
+        self._version = CatalogVersion(directory)
+        self._watcher = None
+        self._watcher_pid = None
+
+    def _export_path(self, product_id):
+        return catalog_paths.product_file_path(product_id, self.directory)
+
+    def _read_details(self, product_id):
+        """Detail fields of a product from its side record; empty if it has none."""
+        try:
+            return json_codec.read_file(catalog_paths.details_file_path(product_id, self.directory))
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logging.error(f"Error loading the details of product {product_id}: {str(e)}")
+            return {}
+
+    def _write_details(self, product_id, details):
+        """Replace a product's detail side record; an empty dict removes it."""
+        path = catalog_paths.details_file_path(product_id, self.directory)
+        if details:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            json_codec.write_file(path, details)
+        else:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _with_details(self, product_id, product):
+        """A new dict with the product's detail fields added to its in-memory record."""
+        return {**product, **self._read_details(product_id)}
+
+    def _set(self, product_id, product):
+        self._products[product_id] = without_search_text(product)
+
+    def _discard(self, product_id):
+        self._products.pop(product_id, None)
+        self._search_texts.pop(product_id, None)
+
+    def _apply(self, record):
+        """Apply one journal record to the in-memory catalog."""
+        op = record.get('op')
+        if op == 'put':
+            product = record['product']
+            self._set(product['product_id'], product)
+            self._set_search_text(product['product_id'], record.get('search_text'))
+        elif op == 'patch':
+            # Patches of detail fields only name them (record['details']); the
+            # values are in the side record
+            current = self._products.get(record['product_id'])
+            if current is None:
+                return
+            # Stored records are shared with list() callers, so never modify them in place
+            product = dict(current)
+            product.update(record.get('set', {}))
+            for key in record.get('unset', []):
+                product.pop(key, None)
+            self._set(record['product_id'], product)
+            changed = {*record.get('set', {}), *record.get('unset', []), *record.get('details', [])}
+            if 'search_text' in record or not changed.isdisjoint(SEARCH_TEXT_FIELDS):
+                # A patch without a text changed none of its fields, unless an
+                # earlier version wrote it; then the text is computed again
+                self._set_search_text(record['product_id'], record.get('search_text'))
+        elif op == 'delete':
+            self._discard(record['product_id'])
+        else:
+            logging.error(f"Skipping journal record with unknown op: {op}")
+
+    def _set_search_text(self, product_id, text):
+        if text is None:
+            self._search_texts.pop(product_id, None)
+        else:
+            self._search_texts[product_id] = text
+
+    def _snapshot_record(self, product_id, product):
+        """Put record of a product for the snapshot, with its search text if it is known."""
+        record = {'op': 'put', 'product': product}
+        text = self._search_texts.get(product_id)
+        if text is not None:
+            record['search_text'] = text
+        return record
+
+    def _read_exports(self):
+        """Read every product export file, for importing a tree that has no journal yet."""
+        products = []
+        for product_id, path in catalog_paths.iter_product_files(self.directory):
+            try:
+                product_data = json_codec.read_file(path)
+            except Exception as e:
+                logging.error(f"Error loading {path}: {str(e)}")
+                continue
+            if 'product_id' not in product_data:
+                # Add product_id if not present (for backward compatibility)
+                product_data['product_id'] = product_id
+            products.append(product_data)
+        return products
+
+    def _write_export(self, product_id, product):
+        """Write the export file of a full product record, or remove it if product is None."""
+        paths = [self._export_path(product_id), catalog_paths.legacy_product_file_path(product_id, self.directory)]
+        if product is not None:
+            os.makedirs(os.path.dirname(paths[0]), exist_ok=True)
+            json_codec.write_file(paths.pop(0), product)
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _start_watcher(self):
+        if self._watcher is not None and self._watcher_pid == os.getpid():
+            self._watcher.close()
+        try:
+            self._watcher = create_watcher(self.directory, suffix='.json')
+        except Exception as e:
+            logging.error(f"Error watching {self.directory} for edited product files: {str(e)}")
+            self._watcher = None
+        # The watcher must not be shared with worker processes forked after it was created
+        self._watcher_pid = os.getpid()
+
+    def _load_locked(self):
+        """Load the snapshot and replay the journal. The caller holds the journal lock."""
+        if not self._journal.exists():
+            products = self._read_exports()
+            # Export files hold the detail fields, so the search texts can be computed right away
+            self._journal.compact([{'op': 'put', 'product': product, 'search_text': product_search_text(product)}
+                                   for product in products])
+            logging.info(f"Imported {len(products)} product files into the catalog journal")
+
+        with self._lock:
+            self._products = {}
+            self._search_texts = {}
+            for record in self._journal.read_snapshot():
+                self._apply(record)
+            for record in self._journal.open():
+                self._apply(record)
+        logging.info(f"Loaded {len(self._products)} products into the product store")
+
+        # Records from before the detail fields were split off still carry them
+        legacy = [product_id for product_id, product in self._products.items()
+                  if any(field in product for field in DETAIL_FIELDS)]
+        if legacy:
+            with self._lock:
+                for product_id in legacy:
+                    core, details = split_details(self._products[product_id])
+                    # A side record written since then holds the newer values
+                    self._write_details(product_id, {**details, **self._read_details(product_id)})
+                    self._set(product_id, core)
+            self._compact_locked()
+            logging.info(f"Moved the detail fields of {len(legacy)} products into side records")
+
+        if self._index.journal_position() != self._journal.position():
+            if self._update_index({}, self._journal.position()):
+                self._version.bump()
+
+    def load(self):
+        """(Re)load the catalog from the snapshot and journal."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with self._journal.lock():
+                self._load_locked()
+        except Exception as e:
+            logging.error(f"Error loading the catalog from {self.directory}: {str(e)}")
+
+    def _catch_up(self):
+        """
+        Apply the journal records appended since the last call.
+
+        Returns:
+            bool: False if the journal has to be reopened with a full load
+        """
+        with self._lock:
+            try:
+                records = self._journal.tail()
+            except Exception as e:
+                logging.error(f"Error reading the catalog journal: {str(e)}")
+                return False
+            if records is None:
+                return False
+            for record in records:
+                self._apply(record)
+            return True
+
+    def refresh(self):
+        """
+        Apply changes written since the last refresh, by this or any other process.
+
+        Only the new part of the journal is read. A full load happens on first use
+        and after another process compacted the journal. Product export files
+        edited by hand since the last refresh are then imported.
+        """
+        if not self._catch_up():
+            self.load()
+        self._import_edited_exports()
+
+    def _import_edited_exports(self):
+        """
+        Journal the product export files that were added, changed or removed
+        outside the store, e.g. by editing response/ by hand.
+
+        The files this or another process exported are reported too; they
+        match the catalog and are skipped.
+        """
+        with self._lock:
+            if self._watcher_pid != os.getpid():
+                # First call, or forked since the watcher was started
+                self._start_watcher()
+            if self._watcher is None:
+                return
+            try:
+                changes = self._watcher.poll()
+            except Exception as e:
+                logging.error(f"Error polling {self.directory} for edited product files: {str(e)}")
+                return
+        if changes is None:
+            # Removals can't be told apart from exports a crash left unwritten, so only look for edits
+            logging.warning(f"Lost track of changes in {self.directory}, checking every product file")
+            changed = {product_id for product_id, _ in catalog_paths.iter_product_files(self.directory)}
+            deleted = set()
+        else:
+            changed, deleted = changes
+        for product_id in sorted(changed | deleted):
+            try:
+                self._import_export(product_id)
+            except Exception as e:
+                logging.error(f"Error importing the edited file of product {product_id}: {str(e)}")
+
+    def _read_export(self, product_id):
+        """A product's export file, or None if it has none."""
+        path = catalog_paths.find_product_file(product_id, self.directory)
+        if path is None:
+            return None
+        product = json_codec.read_file(path)
+        product.setdefault('product_id', product_id)
+        return product
+
+    def _export_differs(self, product_id):
+        """Whether a product's export file no longer matches its catalog record."""
+        product = self._read_export(product_id)
+        core = self._products.get(product_id)
+        if core is None:
+            return product is not None
+        return product is not None and product != self._with_details(product_id, core)
+
+    def _import_export(self, product_id):
+        """Bring a product's catalog record in line with its export file, if they differ."""
+        exported = self._read_export(product_id)
+        if exported is None and product_id not in self._products:
+            return
+        if exported is not None and not self._export_differs(product_id):
+            return
+        with self._writing():
+            # Check again with every write made before the lock was acquired applied
+            exported = self._read_export(product_id)
+            if exported is None:
+                if product_id in self._products:
+                    logging.info(f"Product file of {product_id} was removed, deleting the product")
+                    self._commit({'op': 'delete', 'product_id': product_id}, product_id, details={})
+            elif self._export_differs(product_id):
+                logging.info(f"Importing the edited product file of {product_id}")
+                self._put_locked(exported)
+
+    def _ensure_loaded(self):
+        self.refresh()
+
+    def _rebuild_index(self):
+        """Write the listing index from every product. The caller holds the journal lock."""
+        logging.info("Listing index is missing or out of date, rebuilding it")
+        with self._lock:
+            products = dict(self._products)
+        # Summaries use the specifications and SEO keywords, which are detail fields
+        summaries = {product_id: ProductSummary.from_product(self._with_details(product_id, product))
+                     for product_id, product in products.items()}
+        self._index.write(summaries, self._journal.position())
+
+    def _update_index(self, changes, previous_position):
+        """
+        Bring the listing index up to date after a write. The caller holds the journal lock.
+
+        The index file is only rewritten if a product's summary changed, e.g.
+        not for image feature cache writes. Writes since the position the index
+        is known to match (made by other processes, or lost to a crash before
+        the index was written) are found in the journal and checked too; if
+        the journal was replaced since, the index is rebuilt.
+
+        Args:
+            changes (dict): Full product records keyed by product ID; None for
+                deleted products
+            previous_position (tuple): Journal position before the write
+
+        Returns:
+            bool: Whether the index changed
+        """
+        summaries = self._index.read()
+        indexed_at = self._index.journal_position()
+        changes = dict(changes)
+        if summaries is not None and indexed_at != tuple(previous_position):
+            records = self._journal.records_since(indexed_at) if indexed_at else None
+            if records is None:
+                summaries = None
+            for record in records or ():
+                product_id = record['product']['product_id'] if record.get('op') == 'put' else record.get('product_id')
+                if product_id not in changes:
+                    core = self._products.get(product_id)
+                    changes[product_id] = None if core is None else self._with_details(product_id, core)
+        if summaries is None:
+            self._rebuild_index()
+            return True
+
+        changed = {}
+        for product_id, product in changes.items():
+            summary = None if product is None else ProductSummary.from_product(product)
+            indexed = summaries.get(product_id)
+            if summary is None and indexed is None:
+                continue
+            if summary is None or indexed is None or summary.to_index() != indexed.to_index():
+                changed[product_id] = summary
+        if not changed:
+            self._index.confirm(self._journal.position())
+            return False
+        summaries = dict(summaries)
+        for product_id, summary in changed.items():
+            if summary is None:
+                summaries.pop(product_id, None)
+            else:
+                summaries[product_id] = summary
+        self._index.write(summaries, self._journal.position(), changed=changed)
+        return True
+
+    def _commit(self, record, product_id, details=None, bump_version=True):
+        """
+        Append a change to the journal, apply it, and update the export file, the
+        listing index and the catalog version. The caller holds the journal lock.
+
+        Args:
+            record (dict): Journal record
+            product_id (str): ID of the product the record changes
+            details (dict, optional): New detail fields of the product, written to
+                its side record first; None leaves the side record unchanged
+            bump_version (bool): Increase the catalog version
+        """
+        if details is not None:
+            self._write_details(product_id, details)
+        previous_position = self._journal.position()
+        self._journal.append(record)
+        self._catch_up()
+
+        core = self._products.get(product_id)
+        product = None
+        if core is not None:
+            product = {**core, **(details if details is not None else self._read_details(product_id))}
+        self._write_export(product_id, product)
+        self._update_index({product_id: product}, previous_position)
+        if bump_version:
+            self._version.bump()
+        if self._journal.record_count >= self.compact_every:
+            self._compact_locked()
+
+    def _compact_locked(self):
+        with self._lock:
+            records = [self._snapshot_record(product_id, product) for product_id, product in self._products.items()]
+        # Check the index against the journal about to be replaced
+        if self._update_index({}, self._journal.position()):
+            self._version.bump()
+        self._journal.compact(records)
+        # The in-memory catalog already matches the new snapshot; just follow the new journal
+        with self._lock:
+            self._journal.open()
+        # Record the new journal's position in the index file
+        self._index.write(self._index.read(), self._journal.position(), changed=())
+
+    def compact(self):
+        """Fold the journal into a new snapshot."""
+        with self._journal.lock():
+            if not self._catch_up():
+                self._load_locked()
+            self._compact_locked()
+
+    def get(self, product_id):
+        """
+        Get a single product.
+
+        Args:
+            product_id (str): ID of the product
+
+        Returns:
+            dict or None: A copy of the full product record, including its detail
+                fields, that the caller may modify, or None if the product does not exist
+        """
+        self._ensure_loaded()
+        product = self._products.get(product_id)
+        if product is None:
+            return None
+        return copy.deepcopy(self._with_details(product_id, product))
+
+    def list(self, details=False):
+        """
+        List all products.
+
+        Args:
+            details (bool): Also read every product's detail fields (see
+                DETAIL_FIELDS), which costs a file read per product
+
+        Returns:
+            list: Product records. Without details these are shared with the store
+                and must be treated as read-only; use get() for a modifiable copy.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            products = dict(self._products)
+        if details:
+            return [self._with_details(product_id, product) for product_id, product in products.items()]
+        return list(products.values())
+
+    def list_summaries(self, category=None, sort=None):
+        """
+        List product summaries, optionally restricted to a category.
+
+        Args:
+            category (str, optional): Only return products in this category
+            sort (str, optional): One of SORT_KEYS; when omitted the order is
+                unspecified
+
+        Returns:
+            list: ProductSummary records
+        """
+        if sort:
+            # Walk the listing's pre-sorted order instead of sorting
+            summaries = self._index.ordered(self._listing(), sort if sort in SORT_KEYS else 'newest').page()
+        else:
+            summaries = list(self._listing().values())
+        if category:
+            summaries = [s for s in summaries if s.category == category]
+        return summaries
+
+    def page_summaries(self, sort=None, ids=None, offset=0, limit=None, after=None):
+        """
+        One page of product summaries in listing order.
+
+        The listing's sort order is kept per listing index, so only the
+        summaries on the page are collected.
+
+        Args:
+            sort (str, optional): One of SORT_KEYS; defaults to 'newest'
+            ids (set, optional): Only include these product IDs, e.g. the
+                products matching the catalog filters
+            offset (int): Number of matching products to skip
+            limit (int, optional): Maximum number of products to return
+            after (tuple, optional): (sort key, product ID) the page starts
+                after, from pagination.decode_cursor()
+
+        Returns:
+            list: ProductSummary records
+        """
+        sort = sort if sort in SORT_KEYS else 'newest'
+        listing = self._index.ordered(self._listing(), sort)
+        return listing.page(ids=ids, offset=offset, limit=limit, after=after)
+
+    def price_range(self, min_price=None, max_price=None):
+        """
+        IDs of the products whose parsed price lies within a range.
+
+        Answered by binary searches over the listing's (price, product ID) order.
+
+        Args:
+            min_price (float, optional): Lowest price to include
+            max_price (float, optional): Highest price to include
+
+        Returns:
+            set: Product IDs; products without a readable price are never included
+        """
+        listing = self._index.ordered(self._listing(), 'price_asc')
+        return {summary.product_id for summary in listing.between(min_price, max_price)}
+
+    def match_text(self, query):
+        """
+        Find the products whose search text (see product_search_text()) contains query.
+
+        Args:
+            query (str): Search query; normalized the same way as the search text
+
+        Returns:
+            dict: Number of occurrences of the query, keyed by product ID
+        """
+        needle = normalize_text(query)
+        if not needle:
+            return {}
+        self._ensure_loaded()
+        with self._lock:
+            products = list(self._products.items())
+        matches = {}
+        for product_id, product in products:
+            count = self._search_text(product_id, product).count(needle)
+            if count:
+                matches[product_id] = count
+        return matches
+
+    def _search_text(self, product_id, product):
+        """
+        Search text of a product's in-memory record.
+
+        Products saved before search texts were journaled have none until
+        rebuild_search_text() stores it; theirs is computed here from the
+        record and its detail fields, and kept in memory while the record is
+        current.
+        """
+        text = self._search_texts.get(product_id)
+        if text is not None:
+            return text
+        text = product_search_text(self._with_details(product_id, product))
+        with self._lock:
+            # Unless a journal record replaced the product meanwhile
+            if self._products.get(product_id) is product:
+                self._search_texts.setdefault(product_id, text)
+        return text
+
+    def _listing(self):
+        """Summaries of every product keyed by product ID, from the listing index."""
+        summaries = self._index.read()
+        if summaries is None:
+            # No usable index yet; loading the catalog builds it
+            with self._writing():
+                if self._index.read() is None:
+                    self._rebuild_index()
+                    self._version.bump()
+            summaries = self._index.read()
+        return summaries
+
+    def search_index(self):
+        """
+        SearchIndex of the catalog, kept up to date as this process writes
+        products and rebuilt when the listing index is changed by another.
+        """
+        return self._index.search_index(self._listing())
+
+    def version(self):
+        """
+        Catalog version, changed by every write (see CatalogVersion); compare only for equality.
+
+        Product files edited by hand are imported first, so the version accounts for them.
+        """
+        self._import_edited_exports()
+        self._listing()
+        return self._version.read()
+
+    def facet_index(self):
+        """
+        FacetIndex of the catalog's filter values, rebuilt only when the listing
+        index changes.
+        """
+        return self._index.facets(self._listing())
+
+    def rebuild_index(self):
+        """
+        Regenerate the listing index from the per-product export files.
+
+        Returns:
+            int: Number of products in the index
+        """
+        with self._writing():
+            summaries = {product['product_id']: ProductSummary.from_product(product)
+                         for product in self._read_exports()}
+            self._index.write(summaries, self._journal.position())
+            self._version.bump()
+        return len(summaries)
+
+    @contextmanager
+    def _writing(self):
+        """
+        Hold the journal lock, with everything written before it was acquired applied.
+
+        This one lock serializes every write, rather than one file_lock() per
+        product: each write appends to the shared journal and may rewrite the
+        listing index, so it needs the journal lock anyway, and holding it
+        across the read-modify-write keeps update() from losing changes made
+        by other processes. Readers never take it.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with self._journal.lock():
+            if not self._catch_up():
+                self._load_locked()
+            yield
+
+    def put(self, product):
+        """
+        Create or replace a product, recording it in the journal.
+
+        To change some fields of an existing product, use update() instead so
+        that concurrent changes to other fields are not lost.
+
+        Args:
+            product (dict): Product record; must contain product_id
+        """
+        with self._writing():
+            self._put_locked(product)
+
+    def _put_locked(self, product):
+        """put() for a caller holding the journal lock."""
+        product = without_search_text(product)
+        core, details = split_details(product)
+        self._commit({'op': 'put', 'product': core, 'search_text': product_search_text(product)},
+                     product['product_id'], details)
+
+    def update(self, product_id, mutate, cache_only=False):
+        """
+        Read-modify-write a product while holding the journal lock.
+
+        mutate() sees the latest version of the product, including changes written
+        by other worker processes, and only the fields it changed are journaled.
+
+        Args:
+            product_id (str): ID of the product
+            mutate (callable): Called with the product dict; modifies it in place
+            cache_only (bool): The change only stores a value derived from the
+                product (e.g. image_features) that no page renders, so the
+                catalog version is left as it is
+
+        Returns:
+            dict or None: A copy of the updated product, or None if it does not exist
+        """
+        with self._writing():
+            core = self._products.get(product_id)
+            if core is None:
+                return None
+            current = self._with_details(product_id, core)
+            product = copy.deepcopy(current)
+            mutate(product)
+            changed = {key: value for key, value in product.items() if key not in current or current[key] != value}
+            removed = [key for key in current if key not in product]
+            if not changed and not removed:
+                return product
+
+            record = {
+                'op': 'patch',
+                'product_id': product_id,
+                'set': {key: value for key, value in changed.items() if key not in DETAIL_FIELDS},
+                'unset': [key for key in removed if key not in DETAIL_FIELDS],
+            }
+            changed_details = sorted(key for key in [*changed, *removed] if key in DETAIL_FIELDS)
+            details = None
+            if changed_details:
+                record['details'] = changed_details
+                details = split_details(product)[1]
+            text = product_search_text(product)
+            if text != self._search_texts.get(product_id):
+                record['search_text'] = text
+            self._commit(record, product_id, details, bump_version=not cache_only)
+            return product
+
+    def rebuild_search_text(self):
+        """
+        Recompute the search text of every product and store it in a new
+        snapshot, e.g. for products saved before search texts were journaled.
+
+        Returns:
+            int: Number of products
+        """
+        with self._writing():
+            with self._lock:
+                products = dict(self._products)
+            texts = {product_id: product_search_text(self._with_details(product_id, product))
+                     for product_id, product in products.items()}
+            with self._lock:
+                self._search_texts.update(texts)
+            self._compact_locked()
+            self._version.bump()
+        return len(texts)
+
+    def delete(self, product_id):
+        """Remove a product from the catalog and delete its export file."""
+        with self._writing():
+            self._commit({'op': 'delete', 'product_id': product_id}, product_id, details={})
+
+
+def create_product_store():
+    """
+    Create the product store selected by the CATALOG_BACKEND environment variable.
+
+    CATALOG_BACKEND=sqlite uses the SQLite catalog at CATALOG_DB_PATH (default
+    catalog.db); anything else uses the response directory.
+    """
+    backend = os.environ.get('CATALOG_BACKEND', 'json').lower()
+    if backend == 'sqlite':
+        from utils.sqlite_catalog import SQLiteProductStore
+        db_path = os.environ.get('CATALOG_DB_PATH', 'catalog.db')
+        logging.info(f"Using SQLite product store at {db_path}")
+        return SQLiteProductStore(db_path)
+    return ProductStore('response')
+
+
+# Shared store used by the Flask routes and the similarity helpers
+product_store = create_product_store()
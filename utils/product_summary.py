@@ -0,0 +1,131 @@
+import os
+import sys
+
+from utils.facets import facet_matcher
+from utils.prices import parse_price
+
+
+def _strings(values, lower=False):
+    """Tuple of interned strings from a list field, tolerating missing or malformed values."""
+    if not isinstance(values, (list, tuple)):
+        return ()
+    if lower:
+        return tuple(sys.intern(str(value).lower()) for value in values)
+    return tuple(sys.intern(str(value)) for value in values)
+
+
+def _first_image_url(product):
+    if product.get('image_urls'):
+        return product['image_urls'][0]
+    if product.get('image_paths'):
+        return f"/raw/{os.path.basename(product['image_paths'][0])}"
+    return ''
+
+
+class ProductSummary:
+    """
+    Compact record of the product fields the catalog grid, search page and
+    spotlight render or filter on.
+
+    Listing pages keep one of these per product instead of the full product dict,
+    which also carries detailed_description, persona_descriptions, image_features
+    and specifications. Repeated strings (categories, tags, keywords) are interned
+    so they are shared between products.
+
+    Attributes:
+        keywords (tuple): Lower-cased tags, specifications and SEO keywords, used
+            by the color, material and style filters
+        audiences (tuple): Target audiences, as written in the product
+        colors, materials, styles (tuple): Facet values precomputed from keywords
+            for the catalog's filter options
+        price_value (float or None): The price parsed from its free-text form,
+            for sorting and filtering by price
+        seo_keywords (tuple): SEO keywords, as written in the product, for the
+            search index
+    """
+
+    __slots__ = ('product_id', 'product_name', 'category', 'price', 'image_url',
+                 'tags', 'short_description', 'keywords', 'audiences',
+                 'colors', 'materials', 'styles', 'price_value', 'seo_keywords')
+
+    # Fields holding tuples of strings, stored as lists in the listing index
+    TUPLE_FIELDS = ('tags', 'keywords', 'audiences', 'colors', 'materials', 'styles', 'seo_keywords')
+
+    def __init__(self, product_id, product_name, category, price, image_url,
+                 tags, short_description, keywords, audiences,
+                 colors=(), materials=(), styles=(), price_value=None, seo_keywords=()):
+        self.product_id = product_id
+        self.product_name = product_name
+        self.category = category
+        self.price = price
+        self.image_url = image_url
+        self.tags = tags
+        self.short_description = short_description
+        self.keywords = keywords
+        self.audiences = audiences
+        self.colors = colors
+        self.materials = materials
+        self.styles = styles
+        self.price_value = price_value
+        self.seo_keywords = seo_keywords
+
+    @classmethod
+    def from_product(cls, product):
+        """Build a summary from a parsed response JSON product record."""
+        description = product.get('short_description', '')
+        # If no dedicated description field, use first part of AI-generated description
+        if not description and 'description' in product.get('ai_response', {}):
+            description = product['ai_response']['description'][:100] + '...'
+
+        keywords = (_strings(product.get('tags'), lower=True) +
+                    _strings(product.get('specifications'), lower=True) +
+                    _strings(product.get('seo_keywords'), lower=True))
+        facets = facet_matcher.match(keywords)
+        return cls(
+            product_id=product.get('product_id', ''),
+            product_name=product.get('product_name', ''),
+            category=sys.intern(str(product.get('category', ''))),
+            price=product.get('price', ''),
+            image_url=_first_image_url(product),
+            tags=_strings(product.get('tags')),
+            short_description=description,
+            keywords=keywords,
+            audiences=_strings(product.get('target_audience')),
+            colors=facets.get('color', ()),
+            materials=facets.get('material', ()),
+            styles=facets.get('style', ()),
+            price_value=parse_price(product.get('price')),
+            seo_keywords=_strings(product.get('seo_keywords')),
+        )
+
+    @classmethod
+    def from_index(cls, entry):
+        """Build a summary from its to_index() form."""
+        values = dict(zip(cls.__slots__, entry))
+        for name in cls.TUPLE_FIELDS:
+            values[name] = _strings(values[name])
+        values['category'] = sys.intern(str(values['category']))
+        return cls(**values)
+
+    def to_index(self):
+        """Compact list form, in __slots__ order, stored in the listing index file."""
+        return [getattr(self, name) for name in self.__slots__]
+
+    @property
+    def image_urls(self):
+        """List form of image_url, matching the product dict used by the templates."""
+        return [self.image_url] if self.image_url else []
+
+    def to_dict(self):
+        return {
+            'product_id': self.product_id,
+            'product_name': self.product_name,
+            'category': self.category,
+            'price': self.price,
+            'short_description': self.short_description,
+            'image_urls': self.image_urls,
+            'tags': list(self.tags),
+        }
+
+    def __repr__(self):
+        return f"ProductSummary({self.product_id!r}, {self.product_name!r})"
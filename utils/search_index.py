@@ -0,0 +1,387 @@
+import heapq
+import math
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+
+from utils.search_text import normalize_text
+
+# ProductSummary attributes the search index covers, in posting field-code order
+SEARCH_FIELDS = ('product_name', 'category', 'tags', 'short_description', 'seo_keywords')
+
+# A posting packs (product ordinal, field code, position) into one unsigned 64-bit int
+_FIELD_BITS = 4
+_POSITION_BITS = 16
+_DOC_SHIFT = _FIELD_BITS + _POSITION_BITS
+_POSITION_MASK = (1 << _POSITION_BITS) - 1
+
+# Default weight of an occurrence in each field when ranking; a word in the
+# product name counts three times as much as one in the short description
+FIELD_WEIGHTS = {'product_name': 3.0, 'category': 2.0, 'tags': 1.5, 'short_description': 1.0, 'seo_keywords': 1.5}
+
+# BM25 term frequency saturation and field length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Most terms the partly typed last word of a prefix query expands to, so a
+# one or two letter prefix can't pull in a large share of the dictionary
+MAX_PREFIX_EXPANSIONS = 32
+# Sorts after every character a term can contain, bounding the terms with a prefix
+_LAST_CHARACTER = chr(0x10FFFF)
+
+# Typo tolerance: words of at least FUZZY_MIN_LENGTH characters also match
+# terms within one edit (two from FUZZY_TWO_EDITS_LENGTH characters), up to
+# MAX_CORRECTIONS of them, with each occurrence of a correction weighted
+# FUZZY_PENALTY per edit. Only used when fewer than FUZZY_BELOW products match exactly.
+FUZZY_MIN_LENGTH = 4
+FUZZY_TWO_EDITS_LENGTH = 8
+MAX_CORRECTIONS = 8
+FUZZY_PENALTY = 0.5
+FUZZY_BELOW = 5
+
+# Most padded trigrams one edit can change: an adjacent transposition touches
+# the four trigrams overlapping either swapped character
+_TRIGRAMS_PER_EDIT = 4
+
+# Postings of removed products are dropped once they outnumber this share of the products
+_COMPACT_RATIO = 0.25
+
+
+def tokenize(text):
+    """Terms of text: normalize_text() split on spaces."""
+    return normalize_text(text).split()
+
+
+def _field_texts(summary, field):
+    value = getattr(summary, field)
+    return (value,) if isinstance(value, str) else value
+
+
+def _trigrams(term):
+    """Character trigrams of a term, padded with a space at each end."""
+    padded = f" {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """
+    Number of single-character insertions, deletions, substitutions and
+    adjacent transpositions turning a into b, computed only as far as limit.
+
+    Returns:
+        int or None: The distance, or None if it is more than limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return None
+    before, previous = None, list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            distance = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                distance = min(distance, before[j - 2] + 1)
+            current[j] = distance
+        if min(current) > limit:
+            return None
+        before, previous = previous, current
+    return previous[-1] if previous[-1] <= limit else None
+
+
+def _by_score(item):
+    product_id, score = item
+    return (score, product_id)
+
+
+class SearchIndex:
+    """
+    Inverted index from normalized terms to the products that contain them.
+
+    Each term maps to its postings: one entry per occurrence, holding the
+    product, the field (see SEARCH_FIELDS) and the term's position within that
+    field, packed into an array of 64-bit ints. A lookup reads only the postings
+    of the query's terms, so its cost follows the number of matches rather than
+    the size of the catalog.
+
+    With prefix=True, the last word of a query also matches the terms it is
+    the beginning of, found by binary search in a sorted term dictionary, for
+    results while the word is still being typed.
+
+    rank() orders the matches by BM25 relevance, computed over the fields
+    with per-field weights and length normalization (BM25F). With fuzzy=True
+    and too few exact matches, it also matches misspelled words: terms
+    sharing enough character trigrams with a word are looked up in a
+    trigram index over the term dictionary and kept if they are within a
+    small edit distance.
+
+    Products are added and removed as they are written. Removing a product
+    only forgets its ordinal; its postings are skipped by lookups and dropped
+    in bulk once enough have accumulated.
+    """
+
+    def __init__(self, summaries=()):
+        self._lock = threading.RLock()
+        self._postings = {}
+        # Every term with postings, sorted, for prefix lookups
+        self._terms = []
+        # Terms by character trigram, for finding corrections of misspelled words
+        self._trigrams = {}
+        self._product_ids = []
+        self._ordinals = {}
+        # Number of terms in each field, per ordinal and summed over live products
+        self._lengths = []
+        self._total_lengths = [0] * len(SEARCH_FIELDS)
+        self._removed = 0
+        for summary in summaries:
+            self.add(summary)
+
+    def __len__(self):
+        return len(self._ordinals)
+
+    def add(self, summary):
+        """Index a product, replacing its previous version if it is already indexed."""
+        with self._lock:
+            self.remove(summary.product_id)
+            ordinal = len(self._product_ids)
+            self._product_ids.append(summary.product_id)
+            self._ordinals[summary.product_id] = ordinal
+            lengths = []
+            for code, field in enumerate(SEARCH_FIELDS):
+                position = 0
+                for text in _field_texts(summary, field):
+                    for term in tokenize(text):
+                        postings = self._postings.get(term)
+                        if postings is None:
+                            postings = self._postings[term] = array('Q')
+                            insort(self._terms, term)
+                            for trigram in _trigrams(term):
+                                self._trigrams.setdefault(trigram, set()).add(term)
+                        postings.append((ordinal << _DOC_SHIFT) | (code << _POSITION_BITS)
+                                        | min(position, _POSITION_MASK))
+                        position += 1
+                lengths.append(position)
+                self._total_lengths[code] += position
+            self._lengths.append(tuple(lengths))
+
+    def remove(self, product_id):
+        """Drop a product from the index; unknown IDs are ignored."""
+        with self._lock:
+            ordinal = self._ordinals.pop(product_id, None)
+            if ordinal is None:
+                return
+            self._product_ids[ordinal] = None
+            for code, length in enumerate(self._lengths[ordinal]):
+                self._total_lengths[code] -= length
+            self._lengths[ordinal] = None
+            self._removed += 1
+            if self._removed > 64 and self._removed > _COMPACT_RATIO * len(self._ordinals):
+                self._compact()
+
+    def _compact(self):
+        """Drop the postings of removed products."""
+        live = self._product_ids
+        for term, postings in list(self._postings.items()):
+            kept = array('Q', (posting for posting in postings if live[posting >> _DOC_SHIFT] is not None))
+            if kept:
+                self._postings[term] = kept
+            else:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+                for trigram in _trigrams(term):
+                    terms = self._trigrams[trigram]
+                    terms.discard(term)
+                    if not terms:
+                        del self._trigrams[trigram]
+        self._removed = 0
+
+    def expand(self, prefix, limit=MAX_PREFIX_EXPANSIONS):
+        """
+        Terms of the index starting with prefix.
+
+        When more than limit terms start with it, the ones with the most
+        postings are kept, so a short prefix expands to the words that occur
+        most often in the catalog rather than the first ones alphabetically.
+
+        Args:
+            prefix (str): Normalized beginning of a term
+            limit (int): Maximum number of terms to return
+
+        Returns:
+            list: Up to limit terms, prefix itself first if it is a term, then
+            in dictionary order if all fit and by postings otherwise
+        """
+        with self._lock:
+            start = bisect_left(self._terms, prefix)
+            end = bisect_left(self._terms, prefix + _LAST_CHARACTER, start)
+            terms = self._terms[start:end]
+            if len(terms) <= limit:
+                return terms
+            return heapq.nlargest(limit, terms, key=lambda term: (term == prefix, len(self._postings[term])))
+
+    def corrections(self, word, limit=MAX_CORRECTIONS):
+        """
+        Terms of the index a misspelled word may have been meant as.
+
+        Candidates share enough character trigrams with the word to be within
+        the allowed number of edits (a substitution changes up to three
+        trigrams, an adjacent transposition up to four); each is then checked
+        with edit_distance().
+
+        Args:
+            word (str): Normalized word
+            limit (int): Maximum number of terms to return
+
+        Returns:
+            list: (term, edits) tuples other than the word itself, closest and
+            most frequent first
+        """
+        if len(word) < FUZZY_MIN_LENGTH:
+            return []
+        max_edits = 2 if len(word) >= FUZZY_TWO_EDITS_LENGTH else 1
+        trigrams = _trigrams(word)
+        with self._lock:
+            shared = Counter()
+            for trigram in trigrams:
+                shared.update(self._trigrams.get(trigram, ()))
+            found = []
+            for term, count in shared.items():
+                if term == word or count < len(trigrams) - _TRIGRAMS_PER_EDIT * max_edits:
+                    continue
+                edits = edit_distance(word, term, max_edits)
+                if edits is not None:
+                    found.append((edits, -len(self._postings[term]), term))
+        return [(term, edits) for edits, _, term in sorted(found)[:limit]]
+
+    def _query_terms(self, query, prefix, fuzzy=False):
+        """
+        Alternative terms for each word of a query.
+
+        Returns:
+            tuple: (set of term tuples, one per word; {term: weight} of the
+            corrections added when fuzzy is set)
+        """
+        words = tokenize(query)
+        groups, penalties = set(), {}
+        for number, word in enumerate(words, 1):
+            terms = self.expand(word) if prefix and number == len(words) else [word]
+            if fuzzy:
+                for term, edits in self.corrections(word):
+                    if term not in terms:
+                        terms.append(term)
+                        penalties[term] = FUZZY_PENALTY ** edits
+            groups.add(tuple(terms))
+        return groups, penalties
+
+    def _frequencies(self, groups, field_weight, penalties=None):
+        """
+        Occurrences of each group of alternative terms in the products
+        containing a term of every group.
+
+        Args:
+            groups (set): Tuples of normalized terms
+            field_weight (callable): Called with (ordinal, field code) to
+                weigh the term's occurrences in that field
+            penalties (dict, optional): Extra weight of the occurrences of
+                some terms, e.g. corrections of misspelled words
+
+        Returns:
+            tuple: ({group: {ordinal: weighted occurrences}}, set of matching
+            ordinals); each group's mapping covers every product containing
+            one of its terms, so its length is the group's document frequency
+        """
+        live = self._product_ids
+        frequencies = {}
+        matching = None
+        # Start from the rarest group so the candidate set is as small as possible
+        for group in sorted(groups, key=lambda group: sum(len(self._postings.get(term, ())) for term in group)):
+            counts = frequencies[group] = {}
+            # Occurrences per (ordinal, field) pair, counted in one pass over the postings
+            occurrences = Counter()
+            for term in group:
+                if penalties and term in penalties:
+                    for key, count in Counter(posting >> _POSITION_BITS
+                                              for posting in self._postings.get(term, ())).items():
+                        occurrences[key] += count * penalties[term]
+                else:
+                    occurrences.update(posting >> _POSITION_BITS for posting in self._postings.get(term, ()))
+            for key, count in occurrences.items():
+                ordinal = key >> _FIELD_BITS
+                if live[ordinal] is None:
+                    continue
+                # Products already ruled out by a rarer group only count towards
+                # the document frequency, so they are left unweighted
+                if matching is None or ordinal in matching:
+                    count *= field_weight(ordinal, key & 0xF)
+                counts[ordinal] = counts.get(ordinal, 0) + count
+            matching = set(counts) if matching is None else matching.intersection(counts)
+            if not matching:
+                return frequencies, set()
+        return frequencies, matching
+
+    def _score(self, groups, weights, penalties=None):
+        """BM25F scores of the products matching every group, as (product ID, score) tuples."""
+        products = len(self._ordinals)
+        averages = [total / products if products else 0.0 for total in self._total_lengths]
+        lengths = self._lengths
+
+        def field_weight(ordinal, code):
+            # The field's weight over 1 - b + b * length / average length
+            average = averages[code]
+            if not average:
+                return weights[code]
+            return weights[code] / (1 - BM25_B + BM25_B * lengths[ordinal][code] / average)
+
+        frequencies, matching = self._frequencies(groups, field_weight, penalties)
+        live = self._product_ids
+        idfs = [(math.log(1 + (products - len(counts) + 0.5) / (len(counts) + 0.5)), counts)
+                for counts in frequencies.values()]
+        scored = []
+        for ordinal in matching:
+            score = 0.0
+            for idf, counts in idfs:
+                tf = counts[ordinal]
+                score += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1)
+            scored.append((live[ordinal], score))
+        return scored
+
+    def rank(self, query, limit=None, weights=None, prefix=False, fuzzy=False):
+        """
+        Products containing every term of a query, most relevant first.
+
+        Each term scores idf * tf * (k1 + 1) / (tf + k1), where tf sums the
+        term's occurrences over the fields, each multiplied by its field
+        weight and divided by the field's length relative to its average
+        (BM25F). With prefix=True, the terms the last word expands to count
+        as one term. Only the best limit products are ordered, with a heap;
+        ties go to the newer product.
+
+        With fuzzy=True, a query matching fewer than FUZZY_BELOW products (or
+        limit, if smaller) is scored again with the corrections() of each
+        word as alternatives to it, their occurrences weighted down by
+        FUZZY_PENALTY per edit.
+
+        Args:
+            query (str): Search text; tokenized like the indexed fields
+            limit (int, optional): Maximum number of products to return
+            weights (dict, optional): Weight per field in SEARCH_FIELDS;
+                defaults to FIELD_WEIGHTS, fields left out count 0
+            prefix (bool): Also match terms the last word is the beginning of
+            fuzzy (bool): Fall back to matching misspelled words
+
+        Returns:
+            list: (product ID, score) tuples
+        """
+        weights = FIELD_WEIGHTS if weights is None else weights
+        weights = [weights.get(field, 0.0) for field in SEARCH_FIELDS]
+        with self._lock:
+            groups, _ = self._query_terms(query, prefix)
+            if not groups:
+                return []
+            scored = self._score(groups, weights)
+            if fuzzy and len(scored) < min(FUZZY_BELOW, limit or FUZZY_BELOW):
+                groups, penalties = self._query_terms(query, prefix, fuzzy=True)
+                if penalties:
+                    scored = self._score(groups, weights, penalties)
+        if limit is None:
+            return sorted(scored, key=_by_score, reverse=True)
+        return heapq.nlargest(limit, scored, key=_by_score)
@@ -0,0 +1,58 @@
+import re
+import unicodedata
+
+# Product fields the catalog search and spotlight match queries against. The
+# bulky generated fields (image features, persona copy) and image paths are
+# left out, and so are the JSON key names.
+SEARCH_TEXT_FIELDS = ('product_name', 'category', 'price', 'tags', 'short_description',
+                      'detailed_description', 'specifications', 'seo_keywords',
+                      'target_audience', 'colors', 'materials', 'styles')
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize_text(text):
+    """
+    Normalized form of text for matching: case-folded, accents removed, and
+    every run of punctuation or whitespace turned into a single space.
+    """
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return _NON_WORD.sub(' ', text.casefold()).strip()
+
+
+def _strings(value):
+    if isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _strings(item)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _strings(item)
+    elif value is not None and value != '':
+        yield str(value)
+
+
+def product_search_text(product):
+    """
+    Normalized search text of a product. The stores keep it next to the
+    product record, never in it, so it is not returned or exported.
+
+    Each value of SEARCH_TEXT_FIELDS is normalized with normalize_text() and
+    the values are joined with newlines, which a normalized query never
+    contains, so a substring match can't span two values.
+
+    Args:
+        product (dict): Full product record, detail fields included
+
+    Returns:
+        str: The product's search text
+    """
+    values = (normalize_text(text) for field in SEARCH_TEXT_FIELDS for text in _strings(product.get(field)))
+    return '\n'.join(value for value in values if value)
+
+
+def without_search_text(product):
+    """The product record without the search_text field that earlier versions stored in it."""
+    if 'search_text' not in product:
+        return product
+    return {key: value for key, value in product.items() if key != 'search_text'}
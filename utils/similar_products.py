@@ -2,7 +2,9 @@ import os
 import json
 import logging
 import base64
-from pathlib import Path
+
+from utils.product_store import product_store
+from utils import catalog_paths
 
 # Import openai for image analysis
 from openai import OpenAI
@@ -35,7 +37,8 @@ def encode_image_to_base64(image_path):
 def extract_image_features(image_path, product_id=None):
     """
     Extract features from an image using OpenAI's API.
-    Features are cached in the product's JSON file to avoid repeated API calls.
+    Features are cached in the product's record in the product store to avoid
+    repeated API calls.
     
     Args:
         image_path (str): Path to the image file
@@ -55,20 +58,17 @@ def extract_image_features(image_path, product_id=None):
     
     # First check if we have cached features
     if product_id:
-        json_path = f"response/{product_id}.json"
-        if os.path.exists(json_path):
-            try:
-                with open(json_path, 'r') as f:
-                    product_data = json.load(f)
-                
+        try:
+            product_data = product_store.get(product_id)
+            if product_data is not None:
                 # Check if features are cached
                 if "image_features" in product_data:
                     logging.info(f"Using cached image features for product {product_id}")
                     return product_data["image_features"]
                 
                 logging.info(f"No cached image features found for product {product_id}")
-            except Exception as e:
-                logging.error(f"Error reading cached features: {str(e)}")
+        except Exception as e:
+            logging.error(f"Error reading cached features: {str(e)}")
     
     try:
         # First check if the image file exists
@@ -140,18 +140,10 @@ def extract_image_features(image_path, product_id=None):
             # Cache features if product_id is provided
             if product_id:
                 try:
-                    json_path = f"response/{product_id}.json"
-                    if os.path.exists(json_path):
-                        with open(json_path, 'r') as f:
-                            product_data = json.load(f)
-                        
-                        # Add features to the product data
-                        product_data["image_features"] = features
-                        
-                        # Save updated product data
-                        with open(json_path, 'w') as f:
-                            json.dump(product_data, f, indent=2)
-                            
+                    # Add features to the latest saved product data under its lock
+                    updated = product_store.update(product_id, lambda p: p.update(image_features=features),
+                                                   cache_only=True)
+                    if updated is not None:
                         logging.info(f"Cached image features for product {product_id}")
                 except Exception as e:
                     logging.error(f"Error caching features: {str(e)}")
@@ -171,7 +163,7 @@ def extract_image_features(image_path, product_id=None):
 def calculate_similarity_score(features1, features2, debug=False, product_id=None):
     """
     Calculate similarity score between two feature sets.
-    Also includes metadata from product JSON files when available.
+    Also includes metadata from the product store when available.
     
     Args:
         features1 (dict): First feature set
@@ -189,7 +181,7 @@ def calculate_similarity_score(features1, features2, debug=False, product_id=Non
     total_weight = 0.0
     sub_scores = {}
     
-    # Load product metadata from response JSON files if available
+    # Load product metadata from the product store if available
     product1_data = None
     product2_data = None
     
@@ -204,24 +196,18 @@ def calculate_similarity_score(features1, features2, debug=False, product_id=Non
     # Try to load product metadata
     if product1_id:
         try:
-            json_path = f"response/{product1_id}.json"
-            if os.path.exists(json_path):
-                with open(json_path, "r") as f:
-                    product1_data = json.load(f)
-                    if debug:
-                        logging.info(f"Loaded metadata for product1 ID: {product1_id}")
+            product1_data = product_store.get(product1_id)
+            if product1_data is not None and debug:
+                logging.info(f"Loaded metadata for product1 ID: {product1_id}")
         except Exception as e:
             if debug:
                 logging.warning(f"Failed to load metadata for product1: {str(e)}")
     
     if product2_id:
         try:
-            json_path = f"response/{product2_id}.json"
-            if os.path.exists(json_path):
-                with open(json_path, "r") as f:
-                    product2_data = json.load(f)
-                    if debug:
-                        logging.info(f"Loaded metadata for product2 ID: {product2_id}")
+            product2_data = product_store.get(product2_id)
+            if product2_data is not None and debug:
+                logging.info(f"Loaded metadata for product2 ID: {product2_id}")
         except Exception as e:
             if debug:
                 logging.warning(f"Failed to load metadata for product2: {str(e)}")
@@ -501,20 +487,20 @@ def get_product_image_path(product_data, debug=False):
             url = product_data["image_urls"][0]
             filename = os.path.basename(url)
             
-            # Check if file exists in raw directory
-            if os.path.exists(f"raw/{filename}"):
+            # Check if file exists in raw directory (its shard or the flat layout)
+            local_path = catalog_paths.resolve_raw_file(filename)
+            if local_path:
                 if debug:
-                    logging.info(f"Found local file for image_url: raw/{filename}")
-                image_path = f"raw/{filename}"
+                    logging.info(f"Found local file for image_url: {local_path}")
+                image_path = local_path
             else:
                 # Try fallback strategy with product_id
                 if product_id:
                     # Try to find any file in raw directory starting with product_id
                     try:
-                        raw_files = os.listdir('raw')
-                        matching_files = [f for f in raw_files if f.startswith(product_id)]
+                        matching_files = catalog_paths.find_raw_files(product_id)
                         if matching_files:
-                            image_path = os.path.join('raw', matching_files[0])
+                            image_path = matching_files[0]
                             if debug:
                                 logging.info(f"Found matching file by timestamp: {image_path}")
                         else:
@@ -559,10 +545,9 @@ def get_product_image_path(product_data, debug=False):
             # Last resort: try to find any file in raw directory starting with product_id
             if product_id:
                 try:
-                    raw_files = os.listdir('raw')
-                    matching_files = [f for f in raw_files if f.startswith(product_id)]
+                    matching_files = catalog_paths.find_raw_files(product_id)
                     if matching_files:
-                        image_path = os.path.join('raw', matching_files[0])
+                        image_path = matching_files[0]
                         if debug:
                             logging.info(f"Fallback: Found matching file by timestamp: {image_path}")
                     else:
@@ -593,7 +578,7 @@ def get_product_image_path(product_data, debug=False):
             
             # Try with just the filename in the raw directory
             basename = os.path.basename(image_path)
-            alt_path = os.path.join('raw', basename)
+            alt_path = catalog_paths.resolve_raw_file(basename) or catalog_paths.raw_file_path(basename)
             if os.path.exists(alt_path):
                 if debug:
                     logging.info(f"Found alternate path: {alt_path}")
@@ -641,36 +626,20 @@ def get_similar_products(product_id, threshold=0.3, max_results=4, debug=True):
             logging.error("OPENAI_API_KEY is not set, cannot find similar products")
             return []
             
-        # Get all response files
-        response_dir = Path("response")
-        if not os.path.exists(response_dir):
-            logging.error(f"Response directory does not exist: {response_dir}")
-            os.makedirs(response_dir, exist_ok=True)
-            return []
-            
-        all_responses = list(response_dir.glob("*.json"))
-        logging.info(f"Found {len(all_responses)} total product response files")
+        # Get all products from the product store
+        all_products = product_store.list()
+        logging.info(f"Found {len(all_products)} total products")
         
-        if len(all_responses) < 2:
+        if len(all_products) < 2:
             logging.info("Not enough products to find similar items")
             return []
             
         # Get the target product data
-        target_product_path = response_dir / f"{product_id}.json"
-        if not target_product_path.exists():
+        target_product = product_store.get(product_id)
+        if target_product is None:
             logging.error(f"Product ID {product_id} not found")
             return []
             
-        try:
-            with open(target_product_path, "r") as f:
-                target_product = json.load(f)
-        except json.JSONDecodeError:
-            logging.error(f"Invalid JSON in target product file: {target_product_path}")
-            return []
-        except Exception as e:
-            logging.error(f"Error reading target product file: {str(e)}")
-            return []
-            
         # Get first image of the target product
         logging.info(f"Getting image path for product ID: {product_id}")
         
@@ -715,16 +684,13 @@ def get_similar_products(product_id, threshold=0.3, max_results=4, debug=True):
         processed_products = 0
         
         # Find similar products
-        for response_file in all_responses:
+        for product_data in all_products:
             # Skip the target product
-            product_timestamp = response_file.stem
+            product_timestamp = product_data["product_id"]
             if product_timestamp == product_id:
                 continue
                 
             try:
-                with open(response_file, "r") as f:
-                    product_data = json.load(f)
-                
                 processed_products += 1
                 
                 # Get the first image for comparison
@@ -775,10 +741,6 @@ def get_similar_products(product_id, threshold=0.3, max_results=4, debug=True):
                         "similarity_score": similarity
                     })
                     
-            except json.JSONDecodeError:
-                if debug:
-                    logging.warning(f"Invalid JSON in product file: {response_file}")
-                continue
             except Exception as e:
                 if debug:
                     logging.error(f"Error processing product {product_timestamp}: {str(e)}")
@@ -832,21 +794,15 @@ def check_duplicate_product(images, threshold=0.85, debug=True):
             logging.error(f"Image file does not exist: {images[0]}")
             return False, []
             
-        # Get all response files
-        response_dir = Path("response")
-        if not os.path.exists(response_dir):
-            logging.info(f"Response directory does not exist: {response_dir}")
-            os.makedirs(response_dir, exist_ok=True)
-            return False, []
-            
-        all_responses = list(response_dir.glob("*.json"))
+        # Get all products from the product store
+        all_products = product_store.list()
         
         if debug:
-            logging.info(f"Found {len(all_responses)} product files to check against")
+            logging.info(f"Found {len(all_products)} products to check against")
             logging.info(f"Using first image for comparison: {images[0]}")
         
         # If there are no products to compare against, we can't have duplicates
-        if len(all_responses) == 0:
+        if len(all_products) == 0:
             logging.info("No existing products to check against")
             return False, []
             
@@ -864,26 +820,14 @@ def check_duplicate_product(images, threshold=0.85, debug=True):
         processed_products = 0
         
         # Compare with existing products
-        for response_file in all_responses:
-            product_timestamp = response_file.stem
+        for product_data in all_products:
+            product_timestamp = product_data["product_id"]
             try:
                 processed_products += 1
                 
                 if debug:
                     logging.info(f"Checking product {product_timestamp}")
                 
-                try:
-                    with open(response_file, "r") as f:
-                        product_data = json.load(f)
-                except json.JSONDecodeError:
-                    if debug:
-                        logging.warning(f"Invalid JSON in product file: {response_file}")
-                    continue
-                except Exception as e:
-                    if debug:
-                        logging.error(f"Error reading product file: {str(e)}")
-                    continue
-                
                 # Get the first image for comparison
                 comparison_image_path = get_product_image_path(product_data, debug=debug)
                 
@@ -0,0 +1,497 @@
+import sqlite3
+import logging
+import threading
+
+from utils import json_codec
+from utils.product_summary import ProductSummary
+from utils.product_details import DETAIL_FIELDS
+from utils.facet_index import FacetIndex
+from utils.search_index import SearchIndex
+from utils.prices import parse_price
+from utils.pagination import NO_PRICE
+from utils.search_text import normalize_text, product_search_text, without_search_text
+
+# Product fields stored as their own JSON columns. Anything not listed here
+# (or in the indexed columns) is kept in the catch-all "extra" column.
+JSON_COLUMNS = (
+    'short_description', 'detailed_description', 'specifications', 'tags',
+    'seo_keywords', 'target_audience', 'colors', 'materials', 'styles',
+    'persona_descriptions', 'image_features', 'image_urls', 'images', 'raw_images',
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    product_id TEXT PRIMARY KEY,
+    product_name TEXT NOT NULL DEFAULT '',
+    category TEXT NOT NULL DEFAULT '',
+    price TEXT NOT NULL DEFAULT '',
+    price_value REAL,
+    creation_date TEXT,
+    search_text TEXT NOT NULL DEFAULT '',
+    {json_columns},
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_products_category ON products(category);
+CREATE INDEX IF NOT EXISTS idx_products_price ON products(price_value);
+CREATE INDEX IF NOT EXISTS idx_products_creation_date ON products(creation_date);
+CREATE INDEX IF NOT EXISTS idx_products_name ON products(product_name COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO catalog_meta (key, value) VALUES ('version', 0);
+INSERT OR IGNORE INTO catalog_meta (key, value) VALUES ('epoch', abs(random()));
+CREATE TABLE IF NOT EXISTS product_changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_id TEXT NOT NULL
+);
+""".format(json_columns=',\n    '.join(f"{column} TEXT" for column in JSON_COLUMNS))
+
+# Trigram index of the search_text column; the tokenizer gives substring
+# matching, the same semantics as the in-memory store's match_text()
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(search_text, tokenize='trigram');
+"""
+
+# Rows kept in product_changes. A process whose search or facet index is
+# further behind than this rebuilds it from every product.
+CHANGE_LOG_SIZE = 10000
+
+# Price sort keys, matching pagination.SORT_KEYS: products without a price last
+PRICE_ASC_KEY = f'coalesce(price_value, {NO_PRICE!r})'
+PRICE_DESC_KEY = f'coalesce(-price_value, {NO_PRICE!r})'
+
+SORT_ORDERS = {
+    'newest': 'product_id DESC',
+    'name_asc': 'product_name COLLATE NOCASE ASC, product_id ASC',
+    'name_desc': 'product_name COLLATE NOCASE DESC, product_id DESC',
+    'price_asc': f'{PRICE_ASC_KEY} ASC, product_id ASC',
+    'price_desc': f'{PRICE_DESC_KEY} ASC, product_id ASC',
+}
+
+# Rows after a cursor's (sort key, product ID) position in each sort order
+AFTER_CONDITIONS = {
+    'newest': '(product_id, product_id) < (?, ?)',
+    'name_asc': '(lower(product_name), product_id) > (?, ?)',
+    'name_desc': '(lower(product_name), product_id) < (?, ?)',
+    'price_asc': f'({PRICE_ASC_KEY}, product_id) > (?, ?)',
+    'price_desc': f'({PRICE_DESC_KEY}, product_id) > (?, ?)',
+}
+
+INDEXED_COLUMNS = ('product_id', 'product_name', 'category', 'price', 'creation_date')
+
+# Columns needed to build a ProductSummary; the heavy JSON columns are not read
+SUMMARY_COLUMNS = ('product_id', 'product_name', 'category', 'price', 'short_description',
+                   'image_urls', 'tags', 'specifications', 'seo_keywords', 'target_audience', 'extra')
+
+# Every column except the detail fields, for listing records without them
+CORE_COLUMNS = INDEXED_COLUMNS + tuple(column for column in JSON_COLUMNS if column not in DETAIL_FIELDS) + ('extra',)
+
+
+def _update_search_index(index, changed, summaries):
+    """Apply changed products to a SearchIndex in place; see SQLiteProductStore._follow_changes()."""
+    current = {summary.product_id: summary for summary in summaries}
+    for product_id in changed:
+        if product_id in current:
+            index.add(current[product_id])
+        else:
+            index.remove(product_id)
+    return index
+
+
+def _update_facet_index(facets, changed, summaries):
+    """FacetIndex with changed products applied; see SQLiteProductStore._follow_changes()."""
+    return facets.updated(changed, summaries)
+
+
+class SQLiteProductStore:
+    """
+    Product store backed by a SQLite database instead of the response directory.
+
+    Exposes the same interface as ProductStore, but listing, category filtering,
+    sorting and text search are answered by indexed queries rather than by
+    holding every product in memory. Use migrate_from_directory() to import an
+    existing response/ tree.
+    """
+
+    def __init__(self, db_path='catalog.db'):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._fts = True
+        # (version, change log position, index) each index was last brought up to date at
+        self._search_index = (None, None, None)
+        self._facet_index = (None, None, None)
+        self._init_schema()
+
+    def _connect(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=30)
+            connection.row_factory = sqlite3.Row
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self._local.connection = connection
+        return connection
+
+    def _init_schema(self):
+        connection = self._connect()
+        connection.executescript(SCHEMA)
+        try:
+            connection.executescript(FTS_SCHEMA)
+        except sqlite3.OperationalError as e:
+            # FTS5 or the trigram tokenizer is not compiled in; fall back to scanning search_text
+            logging.warning(f"SQLite FTS5 trigram index unavailable, text search will scan: {str(e)}")
+            self._fts = False
+        connection.commit()
+
+    def _bump_version(self, connection):
+        """Increase the catalog version as part of the current write transaction."""
+        connection.execute("UPDATE catalog_meta SET value = value + 1 WHERE key = 'version'")
+
+    def _log_change(self, connection, product_id):
+        """Record a written product in product_changes as part of the current write transaction."""
+        seq = connection.execute('INSERT INTO product_changes (product_id) VALUES (?)', (product_id,)).lastrowid
+        connection.execute('DELETE FROM product_changes WHERE seq <= ?', (seq - CHANGE_LOG_SIZE,))
+
+    def version(self):
+        """
+        Catalog version, changed by every write; compare only for equality.
+
+        The counter is prefixed with a random epoch chosen when the database
+        was created, so a recreated database never repeats an earlier version.
+        """
+        meta = dict(self._connect().execute(
+            "SELECT key, value FROM catalog_meta WHERE key IN ('epoch', 'version')").fetchall())
+        return f"{meta.get('epoch', 0):x}-{meta.get('version', 0)}"
+
+    def _row_to_product(self, row):
+        columns = row.keys()
+        product = without_search_text(json_codec.loads(row['extra'])) if row['extra'] else {}
+        for column in INDEXED_COLUMNS:
+            if column in columns and row[column] is not None:
+                product[column] = row[column]
+        for column in JSON_COLUMNS:
+            if column in columns and row[column] is not None:
+                product[column] = json_codec.loads(row[column])
+        return product
+
+    def _row_to_summary(self, row):
+        return ProductSummary.from_product(self._row_to_product(row))
+
+    def _select(self, where='', params=(), sort=None, summaries=False, columns=None, limit=None, offset=0):
+        columns = ', '.join(SUMMARY_COLUMNS if summaries else columns or ('*',))
+        sql = f'SELECT {columns} FROM products'
+        if where:
+            sql += f' WHERE {where}'
+        sql += f" ORDER BY {SORT_ORDERS.get(sort, 'product_id DESC')}"
+        if limit is not None or offset:
+            sql += ' LIMIT ? OFFSET ?'
+            params = tuple(params) + (-1 if limit is None else limit, offset)
+        rows = self._connect().execute(sql, params).fetchall()
+        convert = self._row_to_summary if summaries else self._row_to_product
+        return [convert(row) for row in rows]
+
+    def load(self):
+        """Nothing to preload; kept for interface compatibility with ProductStore."""
+
+    def get(self, product_id):
+        """Get a single product by primary key, or None if it does not exist."""
+        row = self._connect().execute('SELECT * FROM products WHERE product_id = ?', (product_id,)).fetchone()
+        return self._row_to_product(row) if row else None
+
+    def list(self, details=False):
+        """
+        List all product records.
+
+        Args:
+            details (bool): Also read the detail fields (see DETAIL_FIELDS); their
+                columns are skipped otherwise
+        """
+        return self._select() if details else self._select(columns=CORE_COLUMNS)
+
+    def list_summaries(self, category=None, sort=None):
+        """
+        List product summaries, optionally restricted to a category.
+
+        Args:
+            category (str, optional): Only return products in this category
+            sort (str, optional): One of SORT_ORDERS ('newest', 'name_asc',
+                'name_desc', 'price_asc' or 'price_desc'); defaults to 'newest'
+
+        Returns:
+            list: ProductSummary records
+        """
+        if category:
+            return self._select('category = ?', (category,), sort=sort, summaries=True)
+        return self._select(sort=sort, summaries=True)
+
+    def page_summaries(self, sort=None, ids=None, offset=0, limit=None, after=None):
+        """
+        One page of product summaries in listing order, as a LIMIT/OFFSET query.
+
+        Args:
+            sort (str, optional): One of SORT_ORDERS; defaults to 'newest'
+            ids (set, optional): Only include these product IDs
+            offset (int): Number of matching products to skip
+            limit (int, optional): Maximum number of products to return
+            after (tuple, optional): (sort key, product ID) the page starts
+                after, from pagination.decode_cursor()
+
+        Returns:
+            list: ProductSummary records
+        """
+        sort = sort if sort in SORT_ORDERS else 'newest'
+        conditions, params = [], []
+        if ids is not None:
+            # One JSON array parameter, however many IDs the filters selected
+            conditions.append('product_id IN (SELECT value FROM json_each(?))')
+            params.append(json_codec.dumps(sorted(ids)))
+        if after is not None:
+            conditions.append(AFTER_CONDITIONS[sort])
+            params.extend(after)
+        return self._select(' AND '.join(conditions), params, sort=sort, summaries=True,
+                            limit=limit, offset=offset)
+
+    def price_range(self, min_price=None, max_price=None):
+        """
+        IDs of the products whose parsed price lies within a range, using the price index.
+
+        Args:
+            min_price (float, optional): Lowest price to include
+            max_price (float, optional): Highest price to include
+
+        Returns:
+            set: Product IDs; products without a readable price are never included
+        """
+        rows = self._connect().execute(
+            'SELECT product_id FROM products WHERE price_value BETWEEN ? AND ?',
+            (-NO_PRICE if min_price is None else min_price, NO_PRICE if max_price is None else max_price)).fetchall()
+        return {row[0] for row in rows}
+
+    def _follow_changes(self, cached, build, update):
+        """
+        Bring an index built from the product summaries up to date.
+
+        When the catalog version changed, only the rows logged in
+        product_changes since the index was last brought up to date are read.
+        The index is built from every summary the first time, and again if
+        the log no longer reaches back that far.
+
+        Args:
+            cached (tuple): (version, change log position, index) from the
+                previous call, or (None, None, None)
+            build (callable): Builds the index from a list of ProductSummary records
+            update (callable): Called with (index, IDs of the changed products,
+                summaries of those that still exist); returns the updated index
+
+        Returns:
+            tuple: (version, change log position, index) for the next call
+        """
+        version = self.version()
+        if cached[0] == version:
+            return cached
+        _, position, index = cached
+        connection = self._connect()
+        # Read the log and the summaries in one transaction, so they agree
+        own_transaction = not connection.in_transaction
+        if own_transaction:
+            connection.execute('BEGIN')
+        try:
+            epoch = connection.execute("SELECT value FROM catalog_meta WHERE key = 'epoch'").fetchone()[0]
+            oldest, latest = connection.execute('SELECT min(seq), coalesce(max(seq), 0) FROM product_changes').fetchone()
+            # A position from another database (same path, recreated) can't be followed
+            since = position[1] if position and position[0] == epoch else None
+            if index is None or since is None or latest < since or (oldest is not None and oldest > since + 1):
+                index = build(self.list_summaries())
+            elif latest > since:
+                changed = [row[0] for row in connection.execute(
+                    'SELECT DISTINCT product_id FROM product_changes WHERE seq > ?', (since,))]
+                summaries = []
+                # Stay below SQLite's limit on the number of query parameters
+                for start in range(0, len(changed), 500):
+                    batch = changed[start:start + 500]
+                    summaries += self._select(f"product_id IN ({', '.join('?' for _ in batch)})", batch,
+                                              summaries=True)
+                index = update(index, changed, summaries)
+        finally:
+            if own_transaction:
+                connection.commit()
+        return (version, (epoch, latest), index)
+
+    def search_index(self):
+        """SearchIndex of the catalog, updated from the changed rows when the catalog version changes."""
+        self._search_index = self._follow_changes(self._search_index, SearchIndex, _update_search_index)
+        return self._search_index[2]
+
+    def facet_index(self):
+        """FacetIndex of the catalog's filter values, updated from the changed rows when the catalog version changes."""
+        self._facet_index = self._follow_changes(self._facet_index, FacetIndex, _update_facet_index)
+        return self._facet_index[2]
+
+    def match_text(self, query):
+        """
+        Find the products whose search text (see product_search_text()) contains query.
+
+        Args:
+            query (str): Search query; normalized the same way as the search text
+
+        Returns:
+            dict: Number of occurrences of the query, keyed by product ID
+        """
+        needle = normalize_text(query)
+        if not needle:
+            return {}
+        if self._fts and len(needle) >= 3:
+            # The trigram index finds the rows containing every trigram of the
+            # query as a phrase, which is a substring match
+            phrase = '"' + needle.replace('"', '""') + '"'
+            rows = self._connect().execute(
+                'SELECT product_id, search_text FROM products WHERE rowid IN '
+                '(SELECT rowid FROM products_fts WHERE products_fts MATCH ?)', (phrase,)).fetchall()
+        else:
+            rows = self._connect().execute(
+                'SELECT product_id, search_text FROM products WHERE instr(search_text, ?) > 0', (needle,)).fetchall()
+        matches = {}
+        for product_id, text in rows:
+            count = text.count(needle)
+            if count:
+                matches[product_id] = count
+        return matches
+
+    def put(self, product, commit=True, bump_version=True):
+        """
+        Create or replace a product.
+
+        Args:
+            product (dict): Product record; must contain product_id
+            commit (bool): Commit immediately; pass False when batching writes
+            bump_version (bool): Increase the catalog version
+        """
+        product = without_search_text(product)
+        values = {column: product.get(column) for column in INDEXED_COLUMNS}
+        values['product_name'] = values['product_name'] or ''
+        values['category'] = values['category'] or ''
+        values['price'] = str(values['price'] or '')
+        values['price_value'] = parse_price(product.get('price'))
+        values['search_text'] = product_search_text(product)
+        for column in JSON_COLUMNS:
+            values[column] = json_codec.dumps(product[column]) if column in product else None
+        extra = {key: value for key, value in product.items()
+                 if key not in JSON_COLUMNS and key not in INDEXED_COLUMNS}
+        values['extra'] = json_codec.dumps(extra) if extra else None
+
+        columns = list(values)
+        connection = self._connect()
+        connection.execute(
+            f"INSERT INTO products ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)}) "
+            f"ON CONFLICT(product_id) DO UPDATE SET "
+            f"{', '.join(f'{column} = excluded.{column}' for column in columns if column != 'product_id')}",
+            [values[column] for column in columns])
+        if self._fts:
+            rowid = connection.execute(
+                'SELECT rowid FROM products WHERE product_id = ?', (values['product_id'],)).fetchone()[0]
+            connection.execute('INSERT OR REPLACE INTO products_fts(rowid, search_text) VALUES (?, ?)',
+                               (rowid, values['search_text']))
+        self._log_change(connection, values['product_id'])
+        if bump_version:
+            self._bump_version(connection)
+        if commit:
+            connection.commit()
+
+    def update(self, product_id, mutate, cache_only=False):
+        """
+        Read-modify-write a product in a single write transaction.
+
+        Args:
+            product_id (str): ID of the product
+            mutate (callable): Called with the product dict; modifies it in place
+            cache_only (bool): The change only stores a value derived from the
+                product (e.g. image_features) that no page renders, so the
+                catalog version is left as it is
+
+        Returns:
+            dict or None: The updated product, or None if it does not exist
+        """
+        connection = self._connect()
+        # BEGIN IMMEDIATE takes the write lock up front so no other writer can
+        # change the row between our read and our write
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            product = self.get(product_id)
+            if product is None:
+                connection.rollback()
+                return None
+            mutate(product)
+            self.put(product, commit=False, bump_version=not cache_only)
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+        return product
+
+    def rebuild_search_text(self):
+        """
+        Recompute the search_text column (and its FTS index) of every product,
+        e.g. for rows written before it held product_search_text(). Search text
+        fields stored in the extra column by earlier versions are dropped.
+
+        Returns:
+            int: Number of products rewritten
+        """
+        connection = self._connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            products = self._select()
+            for product in products:
+                self.put(product, commit=False, bump_version=False)
+            self._bump_version(connection)
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+        return len(products)
+
+    def delete(self, product_id):
+        """Remove a product."""
+        connection = self._connect()
+        row = connection.execute('SELECT rowid FROM products WHERE product_id = ?', (product_id,)).fetchone()
+        if row is None:
+            return
+        if self._fts:
+            connection.execute('DELETE FROM products_fts WHERE rowid = ?', (row[0],))
+        connection.execute('DELETE FROM products WHERE rowid = ?', (row[0],))
+        self._log_change(connection, product_id)
+        self._bump_version(connection)
+        connection.commit()
+
+
+def migrate_from_directory(directory='response', db_path='catalog.db'):
+    """
+    Import every product file from a response directory into a SQLite catalog.
+
+    Existing rows with the same product_id are replaced, so the migration can be
+    re-run safely.
+
+    Args:
+        directory (str): Directory containing the <product_id>.json files
+        db_path (str): Path of the SQLite database to create or update
+
+    Returns:
+        int: Number of products imported
+    """
+    # Imported here because utils.product_store imports this module to build the shared store
+    from utils.product_store import ProductStore
+
+    source = ProductStore(directory)
+    source.load()
+    target = SQLiteProductStore(db_path)
+    imported = 0
+    for product in source.list(details=True):
+        try:
+            target.put(product, commit=False)
+            imported += 1
+        except Exception as e:
+            logging.error(f"Error importing product {product.get('product_id')}: {str(e)}")
+    target._connect().commit()
+    logging.info(f"Imported {imported} products from {directory} into {db_path}")
+    return imported
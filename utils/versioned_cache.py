@@ -0,0 +1,65 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class VersionedLRUCache:
+    """
+    Bounded least-recently-used cache of values computed from the catalog.
+
+    Every lookup passes the current catalog version (see the stores'
+    version()). Values are only valid for the version they were computed
+    at, so the first lookup with a new version empties the cache. With a ttl,
+    entries also expire that many seconds after they were stored.
+    """
+
+    def __init__(self, maxsize=256, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._version = None
+
+    def _check_version(self, version):
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key, version):
+        """Cached value for key at this catalog version, or None."""
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            value = entry[0]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, version, value):
+        """
+        Cache value for key, evicting the least recently used entry if full.
+
+        A value computed at another version than the last lookup's is dropped.
+        """
+        with self._lock:
+            if version != self._version:
+                return
+            expires = None if self.ttl is None else time.monotonic() + self.ttl
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        """Hit and miss counters and the current size."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries),
+                    'maxsize': self.maxsize, 'ttl': self.ttl, 'version': self._version}
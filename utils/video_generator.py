@@ -13,6 +13,8 @@ import random
 from PIL import Image, ImageFilter, ImageEnhance
 from openai import OpenAI
 
+from utils import catalog_paths
+
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
 
@@ -40,14 +42,11 @@ def generate_video_openai(product_data, max_duration=10):
     temp_dir = os.path.abspath("temp")
     os.makedirs(temp_dir, exist_ok=True)
     
-    # Create raw directory if it doesn't exist
-    raw_dir = os.path.abspath('raw')
-    os.makedirs(raw_dir, exist_ok=True)
-        
     # Generate a unique filename for the video based on product_id and timestamp
     product_id = product_data.get('product_id', str(uuid.uuid4()))
     video_filename = f"{product_id}_video.mp4"
-    video_path = os.path.join(raw_dir, video_filename)
+    video_path = os.path.abspath(catalog_paths.raw_file_path(video_filename))
+    os.makedirs(os.path.dirname(video_path), exist_ok=True)
     
     logging.info(f"Starting video generation for product {product_id}")
     
@@ -68,19 +67,17 @@ def generate_video_openai(product_data, max_duration=10):
                 try:
                     # Extract filename from URL
                     filename = url.split('/')[-1]
-                    local_path = os.path.join(raw_dir, filename)
-                    if os.path.exists(local_path):
-                        image_paths.append(local_path)
+                    local_path = catalog_paths.resolve_raw_file(filename)
+                    if local_path:
+                        image_paths.append(os.path.abspath(local_path))
                 except:
                     pass
         
         # If still no paths, look for any image in raw folder with product_id prefix
         if not image_paths:
-            file_prefix = f"{product_id}_"
-            raw_files = [f for f in os.listdir(raw_dir) if os.path.isfile(os.path.join(raw_dir, f))]
-            for file in raw_files:
-                if file.startswith(file_prefix) and file.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')):
-                    image_paths.append(os.path.join(raw_dir, file))
+            for path in catalog_paths.find_raw_files(product_id):
+                if path.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')):
+                    image_paths.append(os.path.abspath(path))
         
         # Sort paths to ensure consistent ordering
         image_paths.sort()
@@ -626,12 +623,10 @@ def get_video_for_product(product_id):
     Returns:
         str or None: Path to video if it exists, None otherwise
     """
-    # Use absolute path
-    raw_dir = os.path.abspath('raw')
-    video_filename = f"{product_id}_video.mp4"
-    video_path = os.path.join(raw_dir, video_filename)
+    # Look in the product's shard, then in the flat legacy layout
+    video_path = catalog_paths.resolve_raw_file(f"{product_id}_video.mp4")
     
-    if os.path.exists(video_path):
-        return video_path
+    if video_path:
+        return os.path.abspath(video_path)
     
     return None
\ No newline at end of file